@@ -0,0 +1,120 @@
+"""Micro-benchmark for parse_evaluation_response over recorded Gemini answers.
+
+Compares the single-pass parser in evaluation_parser.py with the previous
+one-regex-per-field parser, reproduced below. The corpus is a JSON list of text-format answers.
+evaluation_responses.json is a small corpus of redacted answers in the formats the
+model has been seen to use (plain, markdown, inline decision, cut off, mismatched
+total). To benchmark your own traffic, export the raw answers a run recorded in its
+cache, with contact details redacted:
+
+    python benchmarks/parse_benchmark.py --export .cache/evaluations.sqlite --corpus my_responses.json
+    python benchmarks/parse_benchmark.py [--corpus my_responses.json] [--repeat 200]
+
+Only text-format answers are exported; with STRUCTURED_OUTPUT=1 (the default) most
+answers are JSON, so record a corpus with STRUCTURED_OUTPUT=0. Review the exported
+file before sharing it: candidate names inside the analysis text are not redacted.
+"""
+import argparse
+import json
+import logging
+import os
+import re
+import sqlite3
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from evaluation_parser import parse_evaluation_response
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "evaluation_responses.json")
+
+REDACTIONS = [
+    (re.compile(r'[\w.+-]+@[\w-]+(?:\.[\w-]+)+'), '[email]'),
+    (re.compile(r'https?://\S+|(?:www\.)?linkedin\.com/\S+', re.IGNORECASE), '[url]'),
+    (re.compile(r'\+?\d[\d\s().-]{8,}\d'), '[phone]'),
+]
+
+LEGACY_SCORE_PATTERNS = {
+    'technical': r'Technical Skills & Experience:\s*(\d+)/60',
+    'skills': r'Technical Skills:\s*(\d+)/15',
+    'experience': r'Experience Level:\s*(\d+)/15',
+    'tools': r'Tools & Technologies:\s*(\d+)/15',
+    'domain': r'Domain Knowledge:\s*(\d+)/15',
+    'impact': r'Impact & Achievements:\s*(\d+)/40',
+    'quantifiable': r'Quantifiable Impact:\s*(\d+)/20',
+    'problem_solving': r'Problem Solving:\s*(\d+)/20'
+}
+
+
+def legacy_parse_evaluation_response(text: str) -> dict:
+    """The parser this benchmark replaced: nine searches per answer and a double-counted total."""
+    decision_match = re.search(r'DECISION:\s*(SHORTLIST|REJECT)', text, re.IGNORECASE)
+    scores = {}
+    for category, pattern in LEGACY_SCORE_PATTERNS.items():
+        match = re.search(pattern, text, re.IGNORECASE)
+        scores[category] = int(match.group(1)) if match else 0
+    return {
+        "decision": decision_match.group(1) if decision_match else None,
+        "score": sum(scores.values()),
+        "scores": scores,
+        "explanation": text
+    }
+
+
+def export_corpus(cache_path: str, corpus_path: str):
+    """Write the raw text-format answers in an evaluation cache to `corpus_path`, redacted."""
+    conn = sqlite3.connect(cache_path)
+    try:
+        rows = conn.execute("SELECT value FROM entries").fetchall()
+    finally:
+        conn.close()
+    corpus = []
+    for (value,) in rows:
+        # "explanation" is rendered by us for JSON answers, so only the model's raw text is used
+        text = json.loads(value).get("response") or ""
+        if not text.strip() or text.lstrip().startswith("{"):
+            continue
+        for pattern, replacement in REDACTIONS:
+            text = pattern.sub(replacement, text)
+        corpus.append(text)
+    with open(corpus_path, "w", encoding="utf-8") as f:
+        json.dump(corpus, f, indent=2)
+    print(f"Exported {len(corpus)} of {len(rows)} cached answers to {corpus_path} "
+          f"(JSON answers and entries cached without the raw answer are skipped)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200, help="passes over the corpus per timing run")
+    parser.add_argument("--corpus", default=CORPUS_PATH, help="JSON list of recorded answers")
+    parser.add_argument("--export", metavar="CACHE", help="build the corpus from an evaluations.sqlite cache and exit")
+    args = parser.parse_args()
+
+    if args.export:
+        export_corpus(args.export, args.corpus)
+        return
+    if not os.path.exists(args.corpus):
+        sys.exit(f"No corpus at {args.corpus}; export one from a run's cache with --export")
+    with open(args.corpus, encoding="utf-8") as f:
+        corpus = json.load(f)
+    if not corpus:
+        sys.exit(f"Corpus {args.corpus} is empty")
+    # Recorded answers with mismatched totals are expected; keep their warnings out of the timings
+    logging.disable(logging.WARNING)
+
+    print(f"{len(corpus)} responses, {sum(len(text) for text in corpus) / len(corpus):.0f} characters on average")
+    for name, parse in (("legacy", legacy_parse_evaluation_response), ("single-pass", parse_evaluation_response)):
+        best = min(timeit.repeat(lambda: [parse(text) for text in corpus], number=args.repeat, repeat=5))
+        print(f"{name:>12}: {best / (args.repeat * len(corpus)) * 1e6:.1f} µs per response")
+
+    disagreements = sum(
+        legacy_parse_evaluation_response(text)["decision"] is not None
+        and parse_evaluation_response(text)["decision"] is None
+        for text in corpus
+    )
+    print(f"Responses whose decision only the legacy parser found: {disagreements}")
+
+
+if __name__ == "__main__":
+    main()
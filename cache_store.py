@@ -0,0 +1,92 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+
+class SqliteCache:
+    """Persistent string cache in a single SQLite file with size-bounded LRU eviction.
+
+    Entries are evicted least-recently-used first once the stored values exceed
+    `max_bytes`, and entries written more than `max_age` seconds ago are treated as
+    missing and deleted (None keeps them indefinitely). The connection is shared between
+    threads behind a lock, and WAL mode lets several processes read and write the same file.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 256 * 1024 * 1024, max_age: Optional[float] = None):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(entries)")}
+        if "created" not in columns:
+            # Files written before entries expired have no creation time; start their age from last use
+            self._conn.execute("ALTER TABLE entries ADD COLUMN created REAL NOT NULL DEFAULT 0")
+            self._conn.execute("UPDATE entries SET created = last_access")
+        self._expire()
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value, created FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.max_age is not None and row[1] < time.time() - self.max_age:
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._conn.commit()
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def set(self, key: str, value: str):
+        size = len(value.encode('utf-8'))
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, last_access, created) VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now)
+            )
+            self._expire()
+            self._evict()
+            self._conn.commit()
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def _expire(self):
+        if self.max_age is not None:
+            self._conn.execute("DELETE FROM entries WHERE created < ?", (time.time() - self.max_age,))
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = []
+        for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY last_access"):
+            if total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", evicted)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,200 @@
+import json
+import logging
+import re
+
+# Scoring rubric: parent category -> (max points, {sub-score: max points})
+RUBRIC = {
+    "technical": (60, {"skills": 15, "experience": 15, "tools": 15, "domain": 15}),
+    "impact": (40, {"quantifiable": 20, "problem_solving": 20}),
+}
+
+# JSON response field -> sub-score key in RUBRIC
+JSON_SCORE_FIELDS = {
+    "technical_skills": "skills",
+    "experience_level": "experience",
+    "tools_and_technologies": "tools",
+    "domain_knowledge": "domain",
+    "quantifiable_impact": "quantifiable",
+    "problem_solving": "problem_solving",
+}
+
+# Score line label in main4.TEXT_RESPONSE_FORMAT -> RUBRIC key
+TEXT_SCORE_LABELS = {
+    "technical skills & experience": "technical",
+    "technical skills": "skills",
+    "experience level": "experience",
+    "tools & technologies": "tools",
+    "domain knowledge": "domain",
+    "impact & achievements": "impact",
+    "quantifiable impact": "quantifiable",
+    "problem solving": "problem_solving",
+}
+
+# Matches every field of a text evaluation, so one finditer pass extracts them all. Each
+# match starts at a line start, which keeps the scan linear: DECISION may appear anywhere
+# on its line, score and total lines after list markers, and markdown bold may close on
+# either side of the colon ("**Technical Skills**: 10/15" or "**Technical Skills:** 10/15").
+# Longer labels come first so "Technical Skills & Experience" is not read as "Technical Skills".
+EVALUATION_FIELD_PATTERN = re.compile(
+    r'^(?:[^\n]*?DECISION\**:\**\s*(?P<decision>SHORTLIST|REJECT)'
+    r'|[ \t*#>\-\d.]*(?:'
+    r'(?P<label>' + '|'.join(re.escape(label) for label in sorted(TEXT_SCORE_LABELS, key=len, reverse=True))
+    + r')\**:\**\s*(?P<value>\d+)\s*/\s*(?P<maximum>\d+)'
+    r'|TOTAL SCORE\**:\**\s*(?P<total>\d+)))',
+    re.IGNORECASE | re.MULTILINE
+)
+# Decision, eight score lines and the total
+EVALUATION_FIELD_COUNT = len(TEXT_SCORE_LABELS) + 2
+
+def parse_evaluation_response(text: str, require_sub_scores: bool = False) -> dict:
+    """Parse a text evaluation in a single pass that stops once every field is found.
+
+    The first occurrence of each field wins. Sub-scores are clamped to their RUBRIC
+    maximum and missing ones count as 0. Parent scores and the total are computed from
+    the sub-scores; the model's own parent and total lines are only checked against them,
+    except that a stated parent score is used when none of its sub-scores were given.
+    With `require_sub_scores`, raises ValueError if any sub-score is missing, e.g.
+    because the answer was cut off.
+    """
+    decision = None
+    found = {}
+    stated_total = None
+    for match in EVALUATION_FIELD_PATTERN.finditer(text):
+        if match.group("decision"):
+            if decision is None:
+                decision = match.group("decision").upper()
+        elif match.group("label"):
+            found.setdefault(TEXT_SCORE_LABELS[match.group("label").lower()], int(match.group("value")))
+        elif stated_total is None:
+            stated_total = int(match.group("total"))
+        if len(found) + (decision is not None) + (stated_total is not None) == EVALUATION_FIELD_COUNT:
+            break
+    if require_sub_scores:
+        missing = [key for _, children in RUBRIC.values() for key in children if key not in found]
+        if missing:
+            raise ValueError(f"missing sub-scores: {', '.join(missing)}")
+
+    scores = {}
+    for parent, (parent_max, children) in RUBRIC.items():
+        for key, maximum in children.items():
+            value = found.get(key, 0)
+            if value > maximum:
+                logging.warning(f"Score {key}={value} above its maximum {maximum}; using {maximum}")
+                value = maximum
+            scores[key] = value
+        scores[parent] = sum(scores[key] for key in children)
+        if parent in found and not any(key in found for key in children):
+            scores[parent] = min(found[parent], parent_max)
+        elif parent in found and found[parent] != scores[parent]:
+            logging.warning(f"Model {parent} score {found[parent]}/{parent_max} does not match "
+                            f"sum of sub-scores {scores[parent]}; using {scores[parent]}")
+    total_score = sum(scores[parent] for parent in RUBRIC)
+    if stated_total is not None and stated_total != total_score:
+        logging.warning(f"Model total {stated_total} does not match sum of scores {total_score}; using {total_score}")
+    return {
+        "decision": decision,
+        "score": total_score,
+        "scores": scores,
+        "explanation": text
+    }
+
+BATCH_SECTION_PATTERN = re.compile(r'^[\s*#]*=+\s*CANDIDATE\s+(C\d+)\s*=+[\s*#]*$', re.IGNORECASE | re.MULTILINE)
+
+def split_batch_response(text: str) -> dict:
+    """Split a batched answer into {label: section text} using the candidate markers."""
+    matches = list(BATCH_SECTION_PATTERN.finditer(text))
+    sections = {}
+    for n, match in enumerate(matches):
+        end = matches[n + 1].start() if n + 1 < len(matches) else len(text)
+        label = match.group(1).upper()
+        # A repeated marker is ambiguous, so drop the label and let it fall back
+        if label in sections:
+            sections[label] = ""
+        else:
+            sections[label] = text[match.end():end].strip()
+    return sections
+
+def parse_structured_evaluation(data: dict) -> dict:
+    """Validate one JSON evaluation and convert it to the evaluation dict used everywhere else.
+
+    Raises ValueError if the decision or any score is missing or out of range.
+    """
+    decision = str(data.get("decision", "")).upper()
+    if decision not in ("SHORTLIST", "REJECT"):
+        raise ValueError(f"invalid decision {data.get('decision')!r}")
+    scores = {}
+    for field, key in JSON_SCORE_FIELDS.items():
+        value = data.get(field)
+        if not isinstance(value, int) or isinstance(value, bool):
+            raise ValueError(f"missing or non-integer score {field!r}")
+        scores[key] = value
+    for parent, (parent_max, children) in RUBRIC.items():
+        for key, maximum in children.items():
+            if not 0 <= scores[key] <= maximum:
+                raise ValueError(f"score {key}={scores[key]} outside 0-{maximum}")
+        scores[parent] = sum(scores[key] for key in children)
+    total_score = sum(scores[parent] for parent in RUBRIC)
+    if data.get("total_score") != total_score:
+        logging.warning(f"Model total {data.get('total_score')} does not match sum of scores {total_score}; using {total_score}")
+    red_flags = data.get("red_flags") or []
+    explanation = "\n".join([
+        f"DECISION: {decision}",
+        "",
+        "SCORES:",
+        f"1. Technical Skills & Experience: {scores['technical']}/60",
+        f"   - Technical Skills: {scores['skills']}/15",
+        f"   - Experience Level: {scores['experience']}/15",
+        f"   - Tools & Technologies: {scores['tools']}/15",
+        f"   - Domain Knowledge: {scores['domain']}/15",
+        "",
+        f"2. Impact & Achievements: {scores['impact']}/40",
+        f"   - Quantifiable Impact: {scores['quantifiable']}/20",
+        f"   - Problem Solving: {scores['problem_solving']}/20",
+        "",
+        f"TOTAL SCORE: {total_score}",
+        "",
+        "DETAILED ANALYSIS:",
+        str(data.get("detailed_analysis", "")).strip(),
+        "",
+        "RED FLAGS:",
+        "\n".join(f"- {flag}" for flag in red_flags) if red_flags else "None",
+    ])
+    return {
+        "decision": decision,
+        "score": total_score,
+        "scores": scores,
+        "explanation": explanation
+    }
+
+def parse_structured_response(text: str) -> dict:
+    """Parse a JSON-mode answer, falling back to the text parser only if it is not JSON.
+
+    Raises ValueError if the answer is JSON but not a valid evaluation.
+    """
+    try:
+        data = json.loads(text)
+    except ValueError:
+        logging.warning("Structured evaluation is not JSON, falling back to text parsing")
+        return parse_evaluation_response(text)
+    if not isinstance(data, dict):
+        raise ValueError(f"expected a JSON object, got {type(data).__name__}")
+    return parse_structured_evaluation(data)
+
+def parse_structured_batch_response(text: str) -> dict:
+    """Parse a JSON-mode batched answer into {label: evaluation}, skipping invalid entries."""
+    try:
+        candidates = json.loads(text).get("candidates", [])
+    except (ValueError, AttributeError) as e:
+        logging.warning(f"Structured batch evaluation invalid ({str(e)})")
+        return {}
+    evaluations = {}
+    for data in candidates:
+        try:
+            label = str(data.get("candidate", "")).upper()
+            evaluation = parse_structured_evaluation(data)
+        except (ValueError, TypeError, AttributeError) as e:
+            logging.warning(f"Skipping invalid batched evaluation: {str(e)}")
+            continue
+        # A repeated label is ambiguous, so drop it and let it fall back
+        evaluations[label] = None if label in evaluations else evaluation
+    return {label: evaluation for label, evaluation in evaluations.items() if evaluation is not None}
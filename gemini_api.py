@@ -0,0 +1,153 @@
+import datetime
+import hashlib
+import logging
+import threading
+import time
+from typing import Callable, Optional
+
+import google.generativeai as genai
+from google.generativeai import caching
+
+DEFAULT_MODEL = 'gemini-2.0-flash'
+DEFAULT_GENERATION_CONFIG = {
+    "temperature": 0,
+    "top_p": 0.1,
+    "top_k": 1
+}
+
+
+class GeminiEvaluator:
+    """Configured Gemini model shared by all evaluations in a run.
+
+    The API key and model are set up once in the constructor. `generate` holds no
+    per-call state, so one instance can be shared between concurrent workers.
+
+    With `use_context_cache`, a prompt prefix passed to `generate` is uploaded once as
+    Gemini cached content (per distinct prefix, i.e. per job config) and later calls
+    only send the suffix. If the prefix cannot be cached, for example because it is
+    below the model's minimum cacheable size, the full prompt is sent instead. Cached
+    content close to expiry has its TTL extended, and content the server no longer
+    knows (403/404) is dropped and created again.
+
+    `structured_output` tells callers to request JSON answers by passing a
+    `response_schema` to `generate`. `on_usage`, if given, is called with the total
+    token count of every response.
+    """
+
+    def __init__(self, api_key: str, model_name: str = DEFAULT_MODEL, generation_config: dict = None,
+                 use_context_cache: bool = True, context_cache_ttl: int = 3600,
+                 structured_output: bool = True, on_usage: Optional[Callable[[int], None]] = None):
+        if not api_key:
+            raise ValueError("GEMINI_API_KEY environment variable not set")
+        genai.configure(api_key=api_key)
+        self.model_name = model_name
+        self.generation_config = dict(generation_config or DEFAULT_GENERATION_CONFIG)
+        self.model = genai.GenerativeModel(model_name, generation_config=self.generation_config)
+        self.use_context_cache = use_context_cache
+        self.structured_output = structured_output
+        self.on_usage = on_usage
+        self.context_cache_ttl = context_cache_ttl
+        # Extend the TTL once less than this many seconds are left
+        self.context_cache_refresh_margin = min(300, context_cache_ttl / 4)
+        self._cached_contents = {}
+        self._cached_models = {}
+        self._cache_expiry = {}  # prefix key -> time.monotonic() deadline
+        self._cache_lock = threading.RLock()
+
+    def generate(self, prompt: str, prefix: Optional[str] = None, response_schema: Optional[dict] = None) -> str:
+        """Send `prefix + prompt` and return the stripped response text.
+
+        The prefix should be the part of the prompt shared across calls. With a
+        `response_schema`, the model is asked for JSON matching that schema.
+        """
+        generation_config = None
+        if response_schema is not None:
+            generation_config = {
+                **self.generation_config,
+                "response_mime_type": "application/json",
+                "response_schema": response_schema
+            }
+        model = self._model_for_prefix(prefix) if prefix else None
+        if model is not None:
+            try:
+                response = model.generate_content(prompt, generation_config=generation_config)
+            except Exception as e:
+                if getattr(e, "code", None) not in (403, 404):
+                    raise
+                # The cached content expired or was deleted; recreate it once
+                logging.warning(f"Cached prompt prefix unavailable ({str(e)}), recreating it")
+                self._drop_cached_model(self._prefix_key(prefix), model)
+                model = self._model_for_prefix(prefix)
+                if model is not None:
+                    response = model.generate_content(prompt, generation_config=generation_config)
+        if model is None:
+            response = self.model.generate_content((prefix or "") + prompt, generation_config=generation_config)
+        usage = getattr(response, "usage_metadata", None)
+        if self.on_usage and usage is not None:
+            self.on_usage(usage.total_token_count)
+        return response.text.strip()
+
+    @staticmethod
+    def _prefix_key(prefix: str) -> str:
+        return hashlib.sha256(prefix.encode('utf-8')).hexdigest()
+
+    def _model_for_prefix(self, prefix: str) -> Optional[genai.GenerativeModel]:
+        """Return a model bound to cached content for `prefix`, or None if caching is unavailable."""
+        if not self.use_context_cache:
+            return None
+        key = self._prefix_key(prefix)
+        with self._cache_lock:
+            if key in self._cache_expiry and time.monotonic() >= self._cache_expiry[key] - self.context_cache_refresh_margin:
+                self._extend_cached_content(key)
+            if key not in self._cached_models:
+                self._cached_models[key] = self._create_cached_model(key, prefix)
+            return self._cached_models[key]
+
+    def _extend_cached_content(self, key: str):
+        """Push back the expiry of cached content, or forget it so it is created again."""
+        try:
+            self._cached_contents[key].update(ttl=datetime.timedelta(seconds=self.context_cache_ttl))
+        except Exception as e:
+            logging.warning(f"Could not extend cached prompt prefix, recreating it: {str(e)}")
+            self._drop_cached_model(key)
+            return
+        self._cache_expiry[key] = time.monotonic() + self.context_cache_ttl
+
+    def _drop_cached_model(self, key: str, model: Optional[genai.GenerativeModel] = None):
+        """Forget the cached content for `key`, unless another worker already replaced `model`."""
+        with self._cache_lock:
+            if model is not None and self._cached_models.get(key) is not model:
+                return
+            self._cached_models.pop(key, None)
+            self._cached_contents.pop(key, None)
+            self._cache_expiry.pop(key, None)
+
+    def _create_cached_model(self, key: str, prefix: str) -> Optional[genai.GenerativeModel]:
+        try:
+            cached_content = caching.CachedContent.create(
+                model=f"models/{self.model_name}",
+                display_name=f"resume-eval-{key[:16]}",
+                contents=[prefix],
+                ttl=datetime.timedelta(seconds=self.context_cache_ttl)
+            )
+        except Exception as e:
+            logging.warning(f"Context caching unavailable, sending full prompts: {str(e)}")
+            return None
+        self._cached_contents[key] = cached_content
+        self._cache_expiry[key] = time.monotonic() + self.context_cache_ttl
+        return genai.GenerativeModel.from_cached_content(
+            cached_content=cached_content,
+            generation_config=self.generation_config
+        )
+
+    def close(self):
+        """Delete cached contents created by this evaluator."""
+        with self._cache_lock:
+            for cached_content in self._cached_contents.values():
+                try:
+                    cached_content.delete()
+                except Exception as e:
+                    logging.warning(f"Error deleting cached content {cached_content.name}: {str(e)}")
+            self._cached_contents.clear()
+            self._cached_models.clear()
+            self._cache_expiry.clear()
@@ -1,8 +1,16 @@
 import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import requests
-from typing import Dict, List, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from itertools import islice
+from typing import Any, Callable, Dict, Iterator, List, Optional
 from dataclasses import dataclass
 from datetime import datetime
+from rate_limit import RateLimiter
 
 @dataclass
 class Applicant:
@@ -11,24 +19,110 @@ class Applicant:
     resume_url: str
     form_data: Dict
     stage: str
+
+
+class RateLimitedSession(requests.Session):
+    """Session that waits on a shared RateLimiter before every request."""
+
+    def __init__(self, rate_limiter: RateLimiter):
+        super().__init__()
+        self.rate_limiter = rate_limiter
+
+    def request(self, *args, **kwargs):
+        self.rate_limiter.acquire()
+        return super().request(*args, **kwargs)
+
+
+_STOP = object()
+
+
+def _batched(iterable, size: int):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
     
 
 class LeverAPI:
-    def __init__(self, api_key: str):
+    # Cache entries computed from another entry; invalidating the source drops them too
+    DERIVED_CACHE_KEYS = {"stages": ("stage_ids",)}
+
+    def __init__(self, api_key: str, timeout: float = 30, pool_size: int = 20,
+                 max_retries: int = 5, backoff_factor: float = 1.0, cache_ttl: float = 600,
+                 requests_per_second: float = 10, fetch_workers: int = 8):
         self.api_key = api_key
         self.base_url = "https://api.lever.co/v1"
         self.headers = {
             "Authorization": f"Bearer {api_key}",
             "Content-Type": "application/json"
         }
+        self.timeout = timeout
+        self.fetch_workers = fetch_workers
+        # One limiter per client so parallel fetches share Lever's account-wide limit
+        self.rate_limiter = RateLimiter(requests_per_second, period=1.0)
+        self.session = self._build_session(pool_size, max_retries, backoff_factor)
+        self.cache_ttl = cache_ttl
+        self.cache_stats = {"hits": 0, "misses": 0}
+        self._cache: Dict[str, tuple] = {}
+        self._cache_lock = threading.Lock()
+
+    def _build_session(self, pool_size: int, max_retries: int, backoff_factor: float) -> requests.Session:
+        """Create a keep-alive session that retries 429/5xx responses, honoring Retry-After."""
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset({"GET", "PUT", "POST", "DELETE"}),
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        session = RateLimitedSession(self.rate_limiter)
+        session.headers.update(self.headers)
+        session.mount("https://", adapter)
+        return session
+
+    def close(self):
+        """Close pooled connections."""
+        self.session.close()
+
+    def _cached(self, key: str, loader: Callable[[], Any]) -> Any:
+        """Return a cached value for `key`, calling `loader` on a miss or after the TTL.
+
+        Empty results are not cached, so a failed lookup is retried on the next call.
+        """
+        now = time.monotonic()
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry and entry[0] > now:
+                self.cache_stats["hits"] += 1
+                return entry[1]
+            self.cache_stats["misses"] += 1
+        value = loader()
+        if value:
+            with self._cache_lock:
+                self._cache[key] = (now + self.cache_ttl, value)
+        return value
+
+    def invalidate_cache(self, key: Optional[str] = None):
+        """Drop one cached entry (e.g. "stages" or "posting:<id>"), or all entries when no key is given.
+
+        Entries derived from the dropped one, such as "stage_ids" from "stages", are dropped with it.
+        """
+        with self._cache_lock:
+            if key is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(key, None)
+                for derived in self.DERIVED_CACHE_KEYS.get(key, ()):
+                    self._cache.pop(derived, None)
 
     def list_open_postings(self) -> List[Dict]:
         """List all open job postings."""
         try:
-            response = requests.get(
+            response = self.session.get(
                 f"{self.base_url}/postings",
                 params={"state": "published"},
-                headers=self.headers
+                timeout=self.timeout
             )
             response.raise_for_status()
             data = response.json()
@@ -42,9 +136,9 @@ class LeverAPI:
     def list_all_postings(self) -> List[Dict]:
         """List all job postings regardless of state."""
         try:
-            response = requests.get(
+            response = self.session.get(
                 f"{self.base_url}/postings",
-                headers=self.headers
+                timeout=self.timeout
             )
             response.raise_for_status()
             data = response.json()
@@ -56,11 +150,14 @@ class LeverAPI:
             return []
 
     def list_stages(self) -> List[Dict]:
-        """List all available stages in the account."""
+        """List all available stages in the account (cached)."""
+        return self._cached("stages", self._fetch_stages)
+
+    def _fetch_stages(self) -> List[Dict]:
         try:
-            response = requests.get(
+            response = self.session.get(
                 f"{self.base_url}/stages",
-                headers=self.headers
+                timeout=self.timeout
             )
             response.raise_for_status()
             data = response.json()
@@ -74,13 +171,13 @@ class LeverAPI:
     def get_candidates_by_posting(self, posting_id: str) -> List[Dict]:
         """Get all candidates for a specific job posting."""
         try:
-            response = requests.get(
+            response = self.session.get(
                 f"{self.base_url}/opportunities",
                 params={
                     "posting_id": posting_id,
                     "archived": "false"
                 },
-                headers=self.headers
+                timeout=self.timeout
             )
             response.raise_for_status()
             data = response.json()
@@ -94,9 +191,9 @@ class LeverAPI:
     def get_candidate_details(self, opportunity_id: str) -> Dict:
         """Get detailed information about a specific candidate."""
         try:
-            response = requests.get(
+            response = self.session.get(
                 f"{self.base_url}/opportunities/{opportunity_id}",
-                headers=self.headers
+                timeout=self.timeout
             )
             response.raise_for_status()
             return response.json()
@@ -186,9 +283,9 @@ class LeverAPI:
     def test_connection(self) -> bool:
         """Test if the API key is valid and has necessary permissions."""
         try:
-            response = requests.get(
+            response = self.session.get(
                 f"{self.base_url}/postings",
-                headers=self.headers
+                timeout=self.timeout
             )
             response.raise_for_status()
             return True
@@ -197,11 +294,14 @@ class LeverAPI:
             return False
 
     def get_job_posting(self, posting_id: str) -> Dict:
-        """Fetch job posting details from Lever."""
+        """Fetch job posting details from Lever (cached)."""
+        return self._cached(f"posting:{posting_id}", lambda: self._fetch_job_posting(posting_id))
+
+    def _fetch_job_posting(self, posting_id: str) -> Dict:
         try:
-            response = requests.get(
+            response = self.session.get(
                 f"{self.base_url}/postings/{posting_id}",
-                headers=self.headers
+                timeout=self.timeout
             )
             response.raise_for_status()
             data = response.json()
@@ -216,9 +316,9 @@ class LeverAPI:
     def move_candidate_to_stage(self, opportunity_id: str, stage_id: str) -> bool:
         """Move a candidate to a specific stage in Lever."""
         try:
-            response = requests.put(
+            response = self.session.put(
                 f"{self.base_url}/opportunities/{opportunity_id}",
-                headers=self.headers,
+                timeout=self.timeout,
                 json={"stage": stage_id}
             )
             response.raise_for_status()
@@ -230,11 +330,10 @@ class LeverAPI:
     def get_stage_id_by_name(self, stage_name: str) -> str:
         """Get stage ID by stage name."""
         try:
-            stages = self.list_stages()
-            for stage in stages:
-                if stage.get('text', '').lower() == stage_name.lower():
-                    return stage.get('id')
-            return None
+            stage_ids = self._cached("stage_ids", lambda: {
+                stage.get('text', '').lower(): stage.get('id') for stage in self.list_stages()
+            })
+            return stage_ids.get(stage_name.lower())
         except Exception as e:
             print(f"Error getting stage ID for {stage_name}: {str(e)}")
             return None
@@ -243,9 +342,9 @@ class LeverAPI:
         """Tag a candidate as processed in Lever."""
         try:
             url = f"{self.base_url}/opportunities/{opportunity_id}/addTags"
-            response = requests.post(
+            response = self.session.post(
                 url,
-                headers=self.headers,
+                timeout=self.timeout,
                 json={"tags": ["processed"]}
             )
             response.raise_for_status()
@@ -268,9 +367,9 @@ class LeverAPI:
             Exception: If the API request fails
         """
         try:
-            response = requests.delete(
+            response = self.session.delete(
                 f"{self.base_url}/opportunities/{opportunity_id}/tags/processed",
-                headers=self.headers
+                timeout=self.timeout
             )
             response.raise_for_status()
             print(f"✅ Removed processed tag from candidate {opportunity_id}")
@@ -292,9 +391,9 @@ class LeverAPI:
             Exception: If the API request fails
         """
         try:
-            response = requests.get(
+            response = self.session.get(
                 f"{self.base_url}/opportunities/{opportunity_id}",
-                headers=self.headers
+                timeout=self.timeout
             )
             response.raise_for_status()
             data = response.json()
@@ -305,94 +404,189 @@ class LeverAPI:
             print(f"❌ Failed to get tags for {opportunity_id}: {str(e)}")
             raise
 
-    def download_resume(self, posting_id: str = "225695e6-a447-4531-a9a6-af783325d22e", limit: int = 50, offset: int = 0) -> List[tuple[bytes, str, str]]:
-        try:
-            target_job = self.get_job_posting(posting_id)
-            if not target_job:
-                print(f"❌ Could not find job posting with ID: {posting_id}")
-                return []
-
-            print(f"📌 Found job posting: {target_job.get('text')}")
-
-            new_applicant_stage_id = self.get_stage_id_by_name("New Applicant")
-            if not new_applicant_stage_id:
-                print("❌ Could not find New Applicant stage")
-                return []
+    def iter_opportunities(self, posting_id: str, stage_id: Optional[str] = None, page_size: int = 100,
+                           archived: bool = False, **params) -> Iterator[Dict]:
+        """Yield opportunities for a posting, following Lever's `next` cursor.
 
-            response = requests.get(
+        Pages are requested lazily as the caller consumes the iterator, so memory stays
+        flat for postings with thousands of applicants. Extra keyword arguments are
+        passed through as query parameters. Request errors propagate to the caller.
+        """
+        query = {
+            "posting_id": posting_id,
+            "archived": str(archived).lower(),
+            "limit": page_size,
+            **params
+        }
+        if stage_id:
+            query["stage_id"] = stage_id
+        while True:
+            response = self.session.get(
                 f"{self.base_url}/opportunities",
-                params={
-                    "posting_id": posting_id,
-                    "archived": "false",
-                    "stage_id": new_applicant_stage_id,
-                    "limit": limit,
-                    "offset": offset,
-                    "sort": "-createdAt"
-                },
-                headers=self.headers
+                params=query,
+                timeout=self.timeout
             )
             response.raise_for_status()
-            opportunities = response.json().get("data", [])
+            payload = response.json()
+            for opportunity in payload.get("data", []):
+                yield opportunity
+            cursor = payload.get("next")
+            if not payload.get("hasNext") or not cursor:
+                return
+            query["offset"] = cursor
+
+    def fetch_resumes(self, opportunity: Dict, newest_only: bool = True) -> List[tuple[bytes, str, str]]:
+        """Download an opportunity's resume files.
+
+        By default only the most recently created file is downloaded, so candidates who
+        uploaded several versions cost one download, one parse and one evaluation.
+        """
+        candidate_id = opportunity.get("id")
+        candidate_name = opportunity.get("name", "unknown")
+        resumes_response = self.session.get(
+            f"{self.base_url}/opportunities/{candidate_id}/resumes",
+            timeout=self.timeout
+        )
+        resumes_response.raise_for_status()
+        resumes = [resume for resume in resumes_response.json().get("data", []) if resume.get("id")]
+
+        if not resumes:
+            print(f"⚠️ No resume found for candidate {candidate_id}")
+            return []
+
+        if newest_only and len(resumes) > 1:
+            resumes = [max(resumes, key=self._resume_created_at)]
+            print(f"📄 {candidate_name} has several resumes, downloading only the newest")
+
+        downloaded = []
+        for resume in resumes:
+            resume_id = resume.get("id")
+            download_url = f"{self.base_url}/opportunities/{candidate_id}/resumes/{resume_id}/download"
+            file_response = self.session.get(download_url, timeout=self.timeout)
+            file_response.raise_for_status()
+
+            print(f"📥 Downloaded resume for {candidate_name}")
+            downloaded.append((file_response.content, candidate_id, candidate_name))
+        return downloaded
+
+    @staticmethod
+    def _resume_created_at(resume: Dict) -> int:
+        return resume.get("createdAt") or (resume.get("file") or {}).get("uploadedAt") or 0
+
+    def _fetch_resumes_safely(self, opportunity: Dict) -> List[tuple[bytes, str, str]]:
+        try:
+            return self.fetch_resumes(opportunity)
+        except Exception as e:
+            print(f"❌ Error processing candidate {opportunity.get('id')}: {str(e)}")
+            return []
 
-            if not opportunities:
-                print("⚠️ No candidates found in New Applicant stage")
-                return []
+    def iter_resumes(self, posting_id: str, stage_name: str = "New Applicant",
+                     page_size: int = 100) -> Iterator[tuple[bytes, str, str]]:
+        """Stream (resume_bytes, candidate_id, candidate_name) for untagged candidates in a stage.
 
-            downloaded_resumes = []
+        Resumes for each page of opportunities are downloaded by `fetch_workers` threads
+        and yielded in Lever's order. Candidates are not tagged here; tag them once their
+        results are logged (see TagCommitter).
+        """
+        target_job = self.get_job_posting(posting_id)
+        if not target_job:
+            print(f"❌ Could not find job posting with ID: {posting_id}")
+            return
 
-            for opportunity in opportunities:
-                candidate_id = opportunity.get("id")
-                candidate_name = opportunity.get("name", "unknown")
+        print(f"📌 Found job posting: {target_job.get('text')}")
 
+        stage_id = self.get_stage_id_by_name(stage_name)
+        if not stage_id:
+            print(f"❌ Could not find {stage_name} stage")
+            return
+
+        def untagged_opportunities():
+            for opportunity in self.iter_opportunities(posting_id, stage_id, page_size=page_size, sort="-createdAt"):
                 # Skip if already tagged "processed"
                 if "processed" in opportunity.get("tags", []):
-                    print(f"⏩ Skipping already processed candidate: {candidate_id}")
+                    print(f"⏩ Skipping already processed candidate: {opportunity.get('id')}")
                     continue
+                yield opportunity
 
-                try:
-                    resumes_response = requests.get(
-                        f"{self.base_url}/opportunities/{candidate_id}/resumes",
-                        headers=self.headers
-                    )
-                    resumes_response.raise_for_status()
-                    resumes = resumes_response.json().get("data", [])
-
-                    if not resumes:
-                        print(f"⚠️ No resume found for candidate {candidate_id}")
-                        continue
-
-                    for resume in resumes:
-                        resume_id = resume.get("id")
-                        if not resume_id:
-                            continue
-
-                        download_url = f"{self.base_url}/opportunities/{candidate_id}/resumes/{resume_id}/download"
-                        file_response = requests.get(download_url, headers=self.headers)
-                        file_response.raise_for_status()
-
-                        resume_bytes = file_response.content
-                        print(f"📥 Downloaded resume for {candidate_name}")
-                        downloaded_resumes.append((resume_bytes, candidate_id, candidate_name))
-
-                        # Tag as processed and verify
-                        try:
-                            if self.tag_candidate_as_processed(candidate_id):
-                                print(f"✅ Successfully tagged and processed {candidate_name}")
-                            else:
-                                print(f"⚠️ Failed to tag {candidate_name} as processed")
-                        except Exception as tag_error:
-                            print(f"❌ Error tagging {candidate_name}: {str(tag_error)}")
-
-                except Exception as e:
-                    print(f"❌ Error processing candidate {candidate_id}: {str(e)}")
-
-            print(f"✅ Finished downloading {len(downloaded_resumes)} resumes (in memory)")
-            return downloaded_resumes
+        downloaded = 0
+        try:
+            with ThreadPoolExecutor(max_workers=self.fetch_workers) as executor:
+                for batch in _batched(untagged_opportunities(), page_size):
+                    # map() keeps Lever's order regardless of which download finishes first
+                    for resumes in executor.map(self._fetch_resumes_safely, batch):
+                        for resume in resumes:
+                            downloaded += 1
+                            yield resume
 
+        except Exception as e:
+            print(f"❌ Error listing opportunities for posting {posting_id}: {str(e)}")
+
+        print(f"✅ Finished downloading {downloaded} resumes (in memory)")
+
+    def download_resume(self, posting_id: str = "225695e6-a447-4531-a9a6-af783325d22e", limit: int = 50, offset: int = 0) -> List[tuple[bytes, str, str]]:
+        """Return up to `limit` resumes from `iter_resumes`, skipping the first `offset`."""
+        try:
+            return list(islice(self.iter_resumes(posting_id, page_size=limit), offset, offset + limit))
         except Exception as e:
             print(f"❌ Error in download_resume: {str(e)}")
             return []
     
+class TagCommitter:
+    """Background worker that tags candidates as processed off the critical path.
+
+    Submit an opportunity ID only after its result has been durably logged. IDs that
+    queue up while a round of tagging is in flight are coalesced: duplicates and
+    already-tagged IDs are dropped and the rest are tagged together by `workers` threads.
+    `on_tagged`, if given, is called with each ID once it has been tagged.
+    """
+
+    def __init__(self, lever_api: LeverAPI, workers: int = 4,
+                 on_tagged: Optional[Callable[[str], None]] = None):
+        self.lever_api = lever_api
+        self.workers = workers
+        self.on_tagged = on_tagged
+        self.tagged = set()
+        self.failed = []
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="tag-committer", daemon=True)
+        self._thread.start()
+
+    def submit(self, opportunity_id: str):
+        self._queue.put(opportunity_id)
+
+    def close(self, timeout: Optional[float] = None):
+        """Tag everything submitted so far and stop the worker."""
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def _run(self):
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            stopping = False
+            while not stopping:
+                pending = [self._queue.get()]
+                while True:
+                    try:
+                        pending.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if _STOP in pending:
+                    stopping = True
+                ids = [i for i in dict.fromkeys(pending) if i is not _STOP and i not in self.tagged]
+                for opportunity_id, ok in zip(ids, executor.map(self._tag, ids)):
+                    if ok:
+                        self.tagged.add(opportunity_id)
+                        if self.on_tagged:
+                            self.on_tagged(opportunity_id)
+                    else:
+                        self.failed.append(opportunity_id)
+
+    def _tag(self, opportunity_id: str) -> bool:
+        try:
+            return self.lever_api.tag_candidate_as_processed(opportunity_id)
+        except Exception as e:
+            print(f"❌ Error tagging {opportunity_id}: {str(e)}")
+            return False
+
 if __name__ == "__main__":
     # Load environment variables
     from dotenv import load_dotenv
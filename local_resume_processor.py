@@ -1,7 +1,49 @@
+import hashlib
+import io
+import multiprocessing
 import os
-from typing import List, Dict
+import re
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Dict, Optional
+from cache_store import SqliteCache
 from dataclasses import dataclass
-from markitdown import MarkItDown
+from markitdown import MarkItDown, StreamInfo
+
+MIME_TYPES = {
+    '.pdf': 'application/pdf',
+    '.docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    '.doc': 'application/msword',
+    '.rtf': 'application/rtf',
+    '.txt': 'text/plain'
+}
+
+def detect_resume_format(content: bytes) -> str:
+    """Guess a resume's file extension from its magic bytes."""
+    # PDF allows junk before the header as long as it appears in the first 1 KB
+    if b'%PDF-' in content[:1024]:
+        return '.pdf'
+    if content.startswith(b'PK\x03\x04'):
+        try:
+            with zipfile.ZipFile(io.BytesIO(content)) as archive:
+                if 'word/document.xml' in archive.namelist():
+                    return '.docx'
+        except zipfile.BadZipFile:
+            pass
+        return '.zip'
+    if content.startswith(b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'):
+        return '.doc'
+    if content.startswith(b'{\\rtf'):
+        return '.rtf'
+    return '.txt'
+
+PDF_PAGE_PATTERN = re.compile(rb'/Type\s*/Page(?!s)')
+
+def count_pdf_pages(content: bytes) -> int:
+    """Cheap page count from the raw PDF objects (pages inside compressed object streams are missed)."""
+    return len(PDF_PAGE_PATTERN.findall(content))
 
 @dataclass
 class Candidate:
@@ -57,22 +99,131 @@ class LocalResumeProcessor:
             print(f"Error parsing resume {candidate.resume_path}: {str(e)}")
             return None
 
-    def convert_pdf_to_text(self, pdf_content: bytes) -> str:
-        """Convert PDF content to text using MarkItDown."""
+    def convert_bytes_to_text(self, content: bytes) -> str:
+        """Convert an in-memory PDF/DOCX resume to text without touching the disk."""
         try:
-            # Create a temporary file to store the PDF content
-            import tempfile
-            with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as temp_file:
-                temp_file.write(pdf_content)
-                temp_file_path = temp_file.name
-            
-            # Convert the temporary file to text
-            result = self.markitdown.convert(temp_file_path)
-            
-            # Clean up the temporary file
-            os.unlink(temp_file_path)
-            
+            extension = detect_resume_format(content)
+            stream_info = StreamInfo(extension=extension, mimetype=MIME_TYPES.get(extension))
+            result = self.markitdown.convert_stream(io.BytesIO(content), stream_info=stream_info)
             return result.text_content
         except Exception as e:
-            print(f"Error converting PDF to text: {str(e)}")
-            return None 
\ No newline at end of file
+            print(f"Error converting resume to text: {str(e)}")
+            return None
+
+    def convert_pdf_to_text(self, pdf_content: bytes) -> str:
+        """Convert resume content to text. Despite the name, DOCX is detected and handled too."""
+        return self.convert_bytes_to_text(pdf_content)
+
+
+class UnparseableResume(Exception):
+    """A resume that will fail the same way on every attempt (too large, too long, timed out, no text)."""
+
+
+_worker_processor = None
+
+def _init_parse_worker():
+    global _worker_processor
+    _worker_processor = LocalResumeProcessor(candidates_dir=None)
+
+def _parse_in_worker(content: bytes) -> str:
+    return _worker_processor.convert_bytes_to_text(content)
+
+
+class ResumeParsePool:
+    """Converts resume bytes to text in a pool of worker processes.
+
+    MarkItDown/pdfminer is pure Python and CPU-bound, so conversions run in separate
+    processes to use every core. Documents larger than `max_bytes` or PDFs with more
+    than `max_pages` pages are rejected up front. A conversion that runs past `timeout`
+    seconds is abandoned and the pool is replaced, which kills the stuck worker.
+    `parse` may be called from several threads at once.
+
+    When a `cache` is given, extracted text is stored under the SHA-256 of the resume
+    bytes, so a repeat parse costs a hash and a lookup.
+
+    `parse_or_reject` raises UnparseableResume with the reason for failures that would
+    repeat on every run, so the caller can record a final outcome instead of retrying.
+    """
+
+    def __init__(self, workers: Optional[int] = None, timeout: float = 60,
+                 max_bytes: int = 10 * 1024 * 1024, max_pages: int = 30,
+                 cache: Optional[SqliteCache] = None):
+        self.cache = cache
+        self.workers = workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.max_pages = max_pages
+        self._lock = threading.Lock()
+        self._executor = self._new_executor()
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        # Workers start lazily (and again after a restart) while pipeline threads hold locks and
+        # SQLite connections, so they are spawned fresh rather than forked from this process
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_parse_worker
+        )
+
+    def parse(self, content: bytes) -> Optional[str]:
+        """Return the resume text, or None if it was rejected, timed out or failed."""
+        try:
+            return self.parse_or_reject(content)
+        except UnparseableResume as e:
+            print(f"Skipping resume: {str(e)}")
+            return None
+
+    def parse_or_reject(self, content: bytes) -> Optional[str]:
+        """Return the resume text, or None after a transient failure.
+
+        Raises UnparseableResume if the document can never be converted.
+        """
+        if self.cache is None:
+            return self._parse(content)
+        key = hashlib.sha256(content).hexdigest()
+        text = self.cache.get(key)
+        if text is None:
+            text = self._parse(content)
+            if text:
+                self.cache.set(key, text)
+        return text
+
+    def _parse(self, content: bytes) -> Optional[str]:
+        if len(content) > self.max_bytes:
+            raise UnparseableResume(f"file is {len(content)} bytes (limit {self.max_bytes})")
+        if detect_resume_format(content) == '.pdf':
+            pages = count_pdf_pages(content)
+            if pages > self.max_pages:
+                raise UnparseableResume(f"PDF has {pages} pages (limit {self.max_pages})")
+
+        for attempt in range(2):
+            with self._lock:
+                executor = self._executor
+            try:
+                future = executor.submit(_parse_in_worker, content)
+                text = future.result(timeout=self.timeout)
+            except TimeoutError:
+                self._restart(executor)
+                raise UnparseableResume(f"conversion timed out after {self.timeout} seconds")
+            except BrokenProcessPool:
+                # Another document's timeout restarted the pool under us; retry once
+                self._restart(executor)
+                continue
+            if not text or not text.strip():
+                raise UnparseableResume("no text could be extracted")
+            return text
+        return None
+
+    def _restart(self, executor: ProcessPoolExecutor):
+        with self._lock:
+            if self._executor is not executor:
+                return
+            # ProcessPoolExecutor cannot cancel a running task, so stop its workers directly
+            for process in list((executor._processes or {}).values()):
+                process.terminate()
+            executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = self._new_executor()
+
+    def close(self):
+        with self._lock:
+            self._executor.shutdown(wait=True, cancel_futures=True)
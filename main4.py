@@ -4,40 +4,64 @@ from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
 import pickle
-from sheets_api import SheetsAPI
-from local_resume_processor import LocalResumeProcessor
-import google.generativeai as genai
+from sheets_api import JobConfig, SheetsAPI, SheetWriteBuffer, RESULTS_HEADERS, PROCESSED_HEADERS
+from local_resume_processor import ResumeParsePool, UnparseableResume
+from gemini_api import GeminiEvaluator
 import json
 import re
-from datetime import datetime, timedelta
+from datetime import datetime
 import logging
-import time
 import csv
+import hashlib
+from dataclasses import dataclass
+import threading
 import pandas as pd
-from lever_api import LeverAPI
+from lever_api import LeverAPI, TagCommitter
+from pipeline import FairScheduler, Pipeline, Stage
+from quota_ledger import QuotaLedger, TokenBucket
+from retry_policy import QuotaExhaustedError, RetryPolicy
+from run_journal import RunJournal
+from resume_text import compact_resume_text
+from prescreen import SIMILARITY_AVAILABLE, PrescreenRules, prescreen, similarity_scores
+from cache_store import SqliteCache
+from evaluation_parser import (
+    JSON_SCORE_FIELDS, parse_evaluation_response, parse_structured_batch_response, parse_structured_response,
+    split_batch_response
+)
 
 
 # Load environment variables
 load_dotenv()
 
-class QuotaManager:
-    def __init__(self, max_requests=1000, reset_hours=24):
-        self.max_requests = max_requests
-        self.reset_hours = reset_hours
-        self.requests_today = 0
-        self.last_reset = datetime.now()
-    
-    def can_make_request(self):
-        if datetime.now() - self.last_reset > timedelta(hours=self.reset_hours):
-            self.requests_today = 0
-            self.last_reset = datetime.now()
-        return self.requests_today < self.max_requests
-    
-    def increment_request(self):
-        self.requests_today += 1
-
-# Initialize quota manager
-quota_manager = QuotaManager()
+# Durable request ledger shared by concurrent workers and overlapping cron runs, and the
+# token bucket in it that paces Gemini calls instead of waiting for 429s; opened on first use
+_quota_manager = None
+_gemini_rate_limiter = None
+_quota_lock = threading.Lock()
+
+def get_quota_manager():
+    """Return the process-wide (QuotaLedger, TokenBucket) pair, opening the ledger on first use."""
+    global _quota_manager, _gemini_rate_limiter
+    with _quota_lock:
+        if _quota_manager is None:
+            _quota_manager = QuotaLedger(
+                os.path.join(os.getenv("CACHE_DIR", ".cache"), "quota.sqlite"),
+                max_requests=int(os.getenv("GEMINI_DAILY_REQUESTS", "1000"))
+            )
+            _gemini_rate_limiter = TokenBucket(
+                _quota_manager, "gemini", rate_per_minute=float(os.getenv("GEMINI_RPM", "15"))
+            )
+        return _quota_manager, _gemini_rate_limiter
+
+def close_quota_manager():
+    global _quota_manager, _gemini_rate_limiter
+    with _quota_lock:
+        if _quota_manager is not None:
+            _quota_manager.close()
+            _quota_manager = _gemini_rate_limiter = None
+
+# Shared by all evaluation workers; GEMINI_RETRY_BUDGET caps the seconds spent retrying one call
+gemini_retry_policy = RetryPolicy(total_budget=float(os.getenv("GEMINI_RETRY_BUDGET", "600")))
 
 def setup_logging():
     if not os.path.exists('logs'):
@@ -125,134 +149,166 @@ def get_latest_posting_id(sheets_api, spreadsheet_id):
     else:
         return None
 
-def is_already_processed(sheets_api, spreadsheet_id, posting_id, opportunity_id):
-    """Check if a candidate has already been processed."""
-    try:
-        result = sheets_api.service.spreadsheets().values().get(
-            spreadsheetId=spreadsheet_id,
-            range="Processed!A:B"
-        ).execute()
-        values = result.get('values', [])
-        
-        # Check if the Processed sheet exists and has data
-        if not values:
-            return False
-            
-        # Check if the tuple (posting_id, opportunity_id) exists
-        for row in values:
-            if len(row) >= 2 and row[0] == posting_id and row[1] == opportunity_id:
-                return True
-        return False
-    except Exception as e:
-        logging.error(f"Error checking processed status: {str(e)}")
-        return False
+@dataclass
+class PostingContext:
+    posting_id: str  # Value from the Input sheet; used as Posting_ID in the Processed sheet
+    job_config: JobConfig
+    weight: int = 1
+
+def get_input_postings(sheets_api, spreadsheet_id):
+    """Read every posting from the Input sheet as (posting_id, weight).
 
+    Column B may hold a positive integer priority weight (default 1). Duplicate
+    postings keep their first row.
+    """
+    result = sheets_api.service.spreadsheets().values().get(
+        spreadsheetId=spreadsheet_id,
+        range="Input!A2:B"
+    ).execute()
+    postings = {}
+    for row in result.get('values', []):
+        if not row or not row[0].strip():
+            continue
+        posting_id = row[0].strip()
+        try:
+            weight = max(1, int(row[1])) if len(row) > 1 and row[1].strip() else 1
+        except ValueError:
+            logging.warning(f"Ignoring invalid weight {row[1]!r} for posting {posting_id}")
+            weight = 1
+        postings.setdefault(posting_id, weight)
+    return list(postings.items())
 
+def resolve_postings(posting_weights, job_configs):
+    """Match each (posting_id, weight) against the job configs, skipping postings without one."""
+    postings = []
+    for posting_id, weight in posting_weights:
+        logging.info(f"Processing job query: {posting_id}")
+        job_config = find_job_config(job_configs, posting_id)
+        if not job_config:
+            logging.error(f"\nNo job configuration found matching '{posting_id}' in Google Sheets.")
+            logging.info("\nAvailable jobs in Google Sheets:")
+            for idx, available in enumerate(job_configs, 1):
+                logging.info(f"{idx}. {available.job_description[:120].replace(chr(10), ' ')}")
+            continue
+        postings.append(PostingContext(posting_id, job_config, weight))
+    return postings
 
-def log_processed_candidate(sheets_api, spreadsheet_id, posting_id, opportunity_id):
-    """Log a processed candidate to the Processed sheet."""
-    try:
-        # Format timestamp
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-        # Prepare the values
-        values = [[posting_id, opportunity_id, timestamp]]
-        
-        # Try to append to the Processed sheet
+class ProcessedIndex:
+    """In-memory index of (Posting_ID, Opportunity_ID) pairs from the Processed sheet.
+
+    The sheet is read once per run and then refreshed incrementally by fetching
+    only the rows appended since the last load.
+    """
+
+    def __init__(self, sheets_api, spreadsheet_id, sheet_name="Processed"):
+        self.sheets_api = sheets_api
+        self.spreadsheet_id = spreadsheet_id
+        self.sheet_name = sheet_name
+        self.keys = set()
+        self.rows_loaded = 0
+
+    def __contains__(self, key):
+        return key in self.keys
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, posting_id, opportunity_id):
+        self.keys.add((posting_id, opportunity_id))
+
+    def refresh(self):
+        """Load rows appended to the Processed sheet since the last refresh."""
+        start_row = self.rows_loaded + 1
         try:
-            sheets_api.service.spreadsheets().values().append(
-                spreadsheetId=spreadsheet_id,
-                range="Processed!A:C",
-                valueInputOption='RAW',
-                body={'values': values}
+            result = self.sheets_api.service.spreadsheets().values().get(
+                spreadsheetId=self.spreadsheet_id,
+                range=f"{self.sheet_name}!A{start_row}:B"
             ).execute()
         except Exception as e:
-            if "Unable to parse range" in str(e):
-                # Create the Processed sheet if it doesn't exist
-                sheets_api.service.spreadsheets().batchUpdate(
-                    spreadsheetId=spreadsheet_id,
-                    body={
-                        'requests': [{
-                            'addSheet': {
-                                'properties': {
-                                    'title': 'Processed'
-                                }
-                            }
-                        }]
-                    }
-                ).execute()
-                
-                # Add headers
-                sheets_api.service.spreadsheets().values().update(
-                    spreadsheetId=spreadsheet_id,
-                    range="Processed!A1:C1",
-                    valueInputOption='RAW',
-                    body={
-                        'values': [['Posting_ID', 'Opportunity_ID', 'Processed_Timestamp']]
-                    }
-                ).execute()
-                
-                # Retry the append operation
-                sheets_api.service.spreadsheets().values().append(
-                    spreadsheetId=spreadsheet_id,
-                    range="Processed!A:C",
-                    valueInputOption='RAW',
-                    body={'values': values}
-                ).execute()
-            else:
-                raise e
-    except Exception as e:
-        logging.error(f"Error logging processed candidate: {str(e)}")
-        raise
+            if "Unable to parse range" not in str(e):
+                logging.error(f"Error refreshing processed index: {str(e)}")
+            return 0
+        values = result.get('values', [])
+        for row in values:
+            if len(row) >= 2:
+                self.keys.add((row[0], row[1]))
+        self.rows_loaded += len(values)
+        return len(values)
 
-def parse_evaluation_response(text: str) -> dict:
-    try:
-        decision_match = re.search(r'DECISION:\s*(SHORTLIST|REJECT)', text, re.IGNORECASE)
-        decision = decision_match.group(1) if decision_match else None
-        scores = {}
-        score_patterns = {
-            'technical': r'Technical Skills & Experience:\s*(\d+)/60',
-            'skills': r'Technical Skills:\s*(\d+)/15',
-            'experience': r'Experience Level:\s*(\d+)/15',
-            'tools': r'Tools & Technologies:\s*(\d+)/15',
-            'domain': r'Domain Knowledge:\s*(\d+)/15',
-            'impact': r'Impact & Achievements:\s*(\d+)/40',
-            'quantifiable': r'Quantifiable Impact:\s*(\d+)/20',
-            'problem_solving': r'Problem Solving:\s*(\d+)/20'
-        }
-        for category, pattern in score_patterns.items():
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                scores[category] = int(match.group(1))
-            else:
-                scores[category] = 0
-        total_score = sum(scores.values())
-        return {
-            "decision": decision,
-            "score": total_score,
-            "scores": scores,
-            "explanation": text
-        }
-    except Exception as e:
-        logging.error(f"Error parsing evaluation response: {str(e)}")
-        return {
-            "decision": "ERROR",
-            "score": 0,
-            "scores": {},
-            "explanation": text
-        }
-
-def evaluate_resume(job_description: str, recruiter_prompt: str, candidate_resume: str) -> dict:
-    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-    model = genai.GenerativeModel('gemini-2.0-flash',
-        generation_config={
-            "temperature": 0,
-            "top_p": 0.1,
-            "top_k": 1
-        }
-    )
-    time.sleep(4)
-    prompt = f"""   
+def is_already_processed(processed_index, posting_id, opportunity_id):
+    """Check if a candidate has already been processed."""
+    return (posting_id, opportunity_id) in processed_index
+
+
+
+def log_processed_candidate(sheet_writer, posting_id, opportunity_id, processed_index=None):
+    """Queue a processed candidate for the Processed sheet."""
+    sheet_writer.add_processed(posting_id, opportunity_id)
+    if processed_index is not None:
+        processed_index.add(posting_id, opportunity_id)
+
+TEXT_RESPONSE_FORMAT = """Respond with a clear, structured evaluation in this EXACT format:
+
+DECISION: [SHORTLIST / REJECT]
+
+SCORES:
+1. Technical Skills & Experience: [X]/60
+   - Technical Skills: [X]/15
+   - Experience Level: [X]/15
+   - Tools & Technologies: [X]/15
+   - Domain Knowledge: [X]/15
+
+2. Impact & Achievements: [X]/40
+   - Quantifiable Impact: [X]/20
+   - Problem Solving: [X]/20
+
+TOTAL SCORE: [Sum of all scores]
+
+DETAILED ANALYSIS:
+[Provide a detailed analysis of the candidate's resume against each criterion. Justify each score and highlight any areas of strength or concern.]
+
+RED FLAGS:
+[List any specific red flags found in the resume, if any.]"""
+
+JSON_RESPONSE_FORMAT = """Respond with a single JSON object that follows the provided response schema:
+- "decision": "SHORTLIST" or "REJECT"
+- "technical_skills", "experience_level", "tools_and_technologies", "domain_knowledge": integer scores out of 15
+- "quantifiable_impact", "problem_solving": integer scores out of 20
+- "total_score": the sum of the six scores above, out of 100
+- "detailed_analysis": a detailed analysis of the candidate's resume against each criterion. Justify each score and highlight any areas of strength or concern.
+- "red_flags": a list of specific red flags found in the resume (empty if none)"""
+
+EVALUATION_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "decision": {"type": "STRING", "enum": ["SHORTLIST", "REJECT"]},
+        **{field: {"type": "INTEGER"} for field in JSON_SCORE_FIELDS},
+        "total_score": {"type": "INTEGER"},
+        "detailed_analysis": {"type": "STRING"},
+        "red_flags": {"type": "ARRAY", "items": {"type": "STRING"}},
+    },
+    "required": ["decision", *JSON_SCORE_FIELDS, "total_score", "detailed_analysis", "red_flags"],
+}
+
+BATCH_EVALUATION_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "candidates": {
+            "type": "ARRAY",
+            "items": {
+                "type": "OBJECT",
+                "properties": {"candidate": {"type": "STRING"}, **EVALUATION_SCHEMA["properties"]},
+                "required": ["candidate", *EVALUATION_SCHEMA["required"]],
+            },
+        },
+    },
+    "required": ["candidates"],
+}
+
+# The prompt is split into a prefix shared by every candidate of a posting (rubric, job
+# description, recruiter criteria, response format) and a per-candidate suffix, so the
+# prefix can be served from Gemini's context cache.
+EVALUATION_PROMPT_PREFIX = """
 You are an expert recruiter evaluating a candidate for a position. Your task is to thoroughly and objectively evaluate the candidate's resume against the job requirements. Be EXTREMELY strict and thorough in your evaluation. The criteria is based on the job description and the recruiter's prompt. This is a very important task and you need to be very objective in your evaluation.
 
 EVALUATION CRITERIA (100 points total):
@@ -312,220 +368,602 @@ DECISION RULES:
 **Recruiter's Prioritized Criteria:**
 {recruiter_prompt}
 
+---
+
+{response_format}
+
+IMPORTANT: Be extremely strict and objective. Only evaluate what is clearly stated in the resume. Avoid assumptions. If any mandatory requirement is missing or unclear, REJECT the candidate.
+"""
+
+EVALUATION_PROMPT_SUFFIX = """
 **Candidate's Resume:**
 {candidate_resume}
 
 ---
 
-Respond with a clear, structured evaluation in this EXACT format:
+Evaluate the candidate's resume above in the EXACT format specified.
+"""
 
-DECISION: [SHORTLIST / REJECT]
+EVALUATION_BATCH_JSON_PROMPT_SUFFIX = """
+You are evaluating {count} candidates for this position. Evaluate each candidate independently, exactly as you would if they were the only candidate. Each resume below starts with a marker line such as "=== CANDIDATE C1 ===".
 
-SCORES:
-1. Technical Skills & Experience: [X]/60
-   - Technical Skills: [X]/15
-   - Experience Level: [X]/15
-   - Tools & Technologies: [X]/15
-   - Domain Knowledge: [X]/15
+{resumes}
+---
 
-2. Impact & Achievements: [X]/40
-   - Quantifiable Impact: [X]/20
-   - Problem Solving: [X]/20
+Return a JSON object whose "candidates" array has one evaluation per candidate, in the order given, each with "candidate" set to that candidate's label (for example "C1") and the fields specified above.
+"""
 
-TOTAL SCORE: [Sum of all scores]
+EVALUATION_BATCH_PROMPT_SUFFIX = """
+You are evaluating {count} candidates for this position. Evaluate each candidate independently, exactly as you would if they were the only candidate.
 
-DETAILED ANALYSIS:
-[Provide a detailed analysis of the candidate's resume against each criterion. Justify each score and highlight any areas of strength or concern.]
+For EACH candidate, start a new section with a line containing only the marker shown for that candidate (for example "=== CANDIDATE C1 ==="), followed by the evaluation in the EXACT format specified above. Output one section per candidate, in the order given, and nothing else.
 
-RED FLAGS:
-[List any specific red flags found in the resume, if any.]
+{resumes}
+---
 
-IMPORTANT: Be extremely strict and objective. Only evaluate what is clearly stated in the resume. Avoid assumptions. If any mandatory requirement is missing or unclear, REJECT the candidate.
+Evaluate each candidate's resume above in the EXACT format specified, one marked section per candidate.
 """
-    max_retries = 5
-    base_delay = 60
-    max_delay = 300
-    for attempt in range(max_retries):
+
+
+def build_prompt_prefix(job_description: str, recruiter_prompt: str, structured: bool = False) -> str:
+    return EVALUATION_PROMPT_PREFIX.format(
+        job_description=job_description,
+        recruiter_prompt=recruiter_prompt,
+        response_format=JSON_RESPONSE_FORMAT if structured else TEXT_RESPONSE_FORMAT
+    )
+
+def build_prompt_suffix(candidate_resume: str) -> str:
+    return EVALUATION_PROMPT_SUFFIX.format(candidate_resume=candidate_resume)
+
+def build_batch_prompt_suffix(labeled_resumes, structured: bool = False) -> str:
+    """Build the per-request part of a prompt that evaluates several (label, resume) pairs."""
+    resumes = "".join(
+        f"=== CANDIDATE {label} ===\n**Candidate {label}'s Resume:**\n{resume}\n\n"
+        for label, resume in labeled_resumes
+    )
+    template = EVALUATION_BATCH_JSON_PROMPT_SUFFIX if structured else EVALUATION_BATCH_PROMPT_SUFFIX
+    return template.format(count=len(labeled_resumes), resumes=resumes)
+
+# Bump whenever the evaluation prompt, response format or parsed evaluation changes so cached evaluations are not reused
+PROMPT_VERSION = "5"
+
+def evaluation_cache_key(job_description, recruiter_prompt, candidate_resume, model_name, structured=False):
+    """Fingerprint everything that determines an evaluation under deterministic generation settings."""
+    response_format = "json" if structured else "text"
+    payload = json.dumps([job_description, recruiter_prompt, PROMPT_VERSION, response_format, model_name, candidate_resume])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+_default_evaluator = None
+_default_evaluator_lock = threading.Lock()
+
+def get_evaluator():
+    """Return the process-wide GeminiEvaluator, creating it on first use."""
+    global _default_evaluator
+    with _default_evaluator_lock:
+        if _default_evaluator is None:
+            _default_evaluator = GeminiEvaluator(
+                os.getenv("GEMINI_API_KEY"),
+                use_context_cache=os.getenv("GEMINI_CONTEXT_CACHE", "1").lower() in ("1", "true", "yes"),
+                structured_output=os.getenv("STRUCTURED_OUTPUT", "1").lower() in ("1", "true", "yes"),
+                on_usage=lambda tokens: get_quota_manager()[0].record_tokens(tokens)
+            )
+        return _default_evaluator
+
+def generate_with_retries(evaluator, suffix: str, prefix: str, response_schema=None) -> str:
+    """Send one prompt to Gemini under the shared retry policy, rate limiter and daily quota.
+
+    Raises QuotaExhaustedError once the ledger has no requests left.
+    """
+    _, rate_limiter = get_quota_manager()
+
+    def attempt():
+        # Retries are requests too, so each attempt is recorded in the quota ledger
+        acquire_quota()
+        rate_limiter.acquire()
+        return evaluator.generate(suffix, prefix=prefix, response_schema=response_schema)
+
+    text = gemini_retry_policy.call(attempt)
+    logging.info("\nEvaluation Results:\n")
+    logging.info(text)
+    return text
+
+def acquire_quota():
+    quota_manager, _ = get_quota_manager()
+    if not quota_manager.try_acquire():
+        logging.error("Free tier quota exceeded for today. Please try again tomorrow.")
+        raise QuotaExhaustedError("Free tier quota exceeded")
+
+def cache_evaluation(cache, cache_key: str, evaluation: dict, response: str = None):
+    """Cache an evaluation together with the model's raw answer, which parse benchmarks are exported from."""
+    cache.set(cache_key, json.dumps({**evaluation, "response": response}))
+
+def load_cached_evaluation(cached: str) -> dict:
+    evaluation = json.loads(cached)
+    evaluation.pop("response", None)
+    return evaluation
+
+def evaluate_resume(job_description: str, recruiter_prompt: str, candidate_resume: str, evaluator=None,
+                    cache=None, force_reevaluate=False) -> dict:
+    if evaluator is None:
+        evaluator = get_evaluator()
+    cache_key = None
+    if cache is not None:
+        cache_key = evaluation_cache_key(
+            job_description, recruiter_prompt, candidate_resume, evaluator.model_name, evaluator.structured_output
+        )
+        cached = None if force_reevaluate else cache.get(cache_key)
+        if cached:
+            logging.info("Using cached evaluation (no Gemini request)")
+            return load_cached_evaluation(cached)
+    suffix = build_prompt_suffix(candidate_resume)
+    if evaluator.structured_output:
+        prefix = build_prompt_prefix(job_description, recruiter_prompt, structured=True)
+        response = generate_with_retries(evaluator, suffix, prefix, response_schema=EVALUATION_SCHEMA)
+        try:
+            evaluation = parse_structured_response(response)
+        except (ValueError, TypeError) as e:
+            # Re-ask once in the text format rather than logging an invalid evaluation
+            logging.warning(f"Structured evaluation invalid ({str(e)}), asking again without a schema")
+            prefix = build_prompt_prefix(job_description, recruiter_prompt, structured=False)
+            response = generate_with_retries(evaluator, suffix, prefix)
+            evaluation = parse_evaluation_response(response)
+    else:
+        prefix = build_prompt_prefix(job_description, recruiter_prompt, structured=False)
+        response = generate_with_retries(evaluator, suffix, prefix)
+        evaluation = parse_evaluation_response(response)
+    if evaluation["decision"] is None:
+        # Not cached or logged, so the journal leaves the candidate to be evaluated again
+        raise ValueError("Evaluation has no decision and could not be parsed")
+    if cache_key:
+        cache_evaluation(cache, cache_key, evaluation, response)
+    return evaluation
+
+def evaluate_resumes_batch(job_description: str, recruiter_prompt: str, candidate_resumes: list, evaluator=None,
+                           cache=None, force_reevaluate=False) -> list:
+    """Evaluate several resumes with one Gemini request.
+
+    Returns one evaluation per resume, in order. Cached resumes are not resent, and any
+    candidate whose section of the batched answer cannot be parsed is re-evaluated on
+    its own. An entry is None if that single-resume fallback also fails.
+    """
+    if evaluator is None:
+        evaluator = get_evaluator()
+    evaluations = [None] * len(candidate_resumes)
+    cache_keys = [None] * len(candidate_resumes)
+    pending = []
+    for index, candidate_resume in enumerate(candidate_resumes):
+        if cache is not None:
+            cache_keys[index] = evaluation_cache_key(
+                job_description, recruiter_prompt, candidate_resume, evaluator.model_name, evaluator.structured_output
+            )
+            cached = None if force_reevaluate else cache.get(cache_keys[index])
+            if cached:
+                evaluations[index] = load_cached_evaluation(cached)
+                continue
+        pending.append(index)
+
+    if len(pending) > 1:
+        structured = evaluator.structured_output
+        labels = [f"C{n + 1}" for n in range(len(pending))]
+        prefix = build_prompt_prefix(job_description, recruiter_prompt, structured)
+        suffix = build_batch_prompt_suffix(list(zip(labels, [candidate_resumes[i] for i in pending])), structured)
+        if structured:
+            text = generate_with_retries(evaluator, suffix, prefix, response_schema=BATCH_EVALUATION_SCHEMA)
+            parsed = parse_structured_batch_response(text)
+        else:
+            sections = split_batch_response(generate_with_retries(evaluator, suffix, prefix))
+            parsed = {}
+            for label, section in sections.items():
+                try:
+                    parsed[label] = parse_evaluation_response(section, require_sub_scores=True)
+                except ValueError as e:
+                    # Typically the answer was cut off at the output token limit
+                    logging.warning(f"Batched section {label} incomplete ({str(e)})")
+        for label, index in zip(labels, pending):
+            evaluation = parsed.get(label)
+            if evaluation is None or evaluation["decision"] in (None, "ERROR"):
+                continue
+            evaluations[index] = evaluation
+            if cache_keys[index]:
+                # A text section is the model's own answer; a JSON entry has no raw text of its own
+                cache_evaluation(cache, cache_keys[index], evaluation, None if structured else evaluation["explanation"])
+
+    for index in pending:
+        if evaluations[index] is not None:
+            continue
+        if len(pending) > 1:
+            logging.warning(f"Batched answer for resume {index + 1} could not be parsed, evaluating it on its own")
         try:
-            response = model.generate_content(prompt)
-            text = response.text.strip()
-            logging.info("\nEvaluation Results:\n")
-            logging.info(text)
-            return parse_evaluation_response(text)
+            evaluations[index] = evaluate_resume(
+                job_description, recruiter_prompt, candidate_resumes[index],
+                evaluator=evaluator, cache=cache, force_reevaluate=force_reevaluate
+            )
         except Exception as e:
-            error_msg = str(e)
-            if "429" in error_msg:
-                if "quota_value: 1000" in error_msg:
-                    logging.error("Free tier quota exceeded. Please upgrade your plan or try again tomorrow.")
-                    raise Exception("Free tier quota exceeded")
-                else:
-                    delay = min(base_delay * (2 ** attempt), max_delay)
-                    logging.warning(f"Rate limit hit (attempt {attempt + 1}/{max_retries}), waiting {delay} seconds...")
-                    time.sleep(delay)
-            elif "503" in error_msg:
-                delay = min(base_delay * (2 ** attempt), max_delay)
-                logging.warning(f"Service unavailable (attempt {attempt + 1}/{max_retries}), waiting {delay} seconds...")
-                time.sleep(delay)
-            elif "timeout" in error_msg.lower():
-                delay = min(base_delay * (2 ** attempt), max_delay)
-                logging.warning(f"Timeout occurred (attempt {attempt + 1}/{max_retries}), waiting {delay} seconds...")
-                time.sleep(delay)
-            else:
-                logging.error(f"Unexpected error: {error_msg}")
-                if attempt == max_retries - 1:
-                    raise
-    raise Exception("Failed to get evaluation after all retries")
+            if "Free tier quota exceeded" in str(e):
+                raise
+            logging.error(f"Error evaluating resume {index + 1} of batch: {str(e)}")
+    return evaluations
 
 def process_local_resumes():
+    sheet_writer = None
+    lever_api = None
+    tag_committer = None
+    parse_pool = None
+    evaluation_cache = None
+    evaluator = None
+    journal = None
     try:
         log_file = setup_logging()
         logging.info("Starting resume evaluation...")
         credentials = get_google_credentials()
         sheets_api = SheetsAPI(credentials)
         spreadsheet_id = os.getenv("SPREADSHEET_ID")
-        job_posting_id = get_latest_posting_id(sheets_api, spreadsheet_id)
-        if not job_posting_id:
-            logging.error("No Posting_id found in Input sheet.")
-            return
-        logging.info(f"Processing job query: {job_posting_id}")
         job_configs = sheets_api.get_job_configs(spreadsheet_id)
-        target_job_config = find_job_config(job_configs, job_posting_id)
-        if not target_job_config:
-            logging.error(f"\nNo job configuration found matching '{job_posting_id}' in Google Sheets.")
-            logging.info("\nAvailable jobs in Google Sheets:")
-            for idx, job_config in enumerate(job_configs, 1):
-                logging.info(f"{idx}. {job_config.job_description[:120].replace(chr(10), ' ')}")
+        if os.getenv("PROCESS_ALL_POSTINGS", "").lower() in ("1", "true", "yes"):
+            postings = resolve_postings(get_input_postings(sheets_api, spreadsheet_id), job_configs)
+        else:
+            job_posting_id = get_latest_posting_id(sheets_api, spreadsheet_id)
+            if not job_posting_id:
+                logging.error("No Posting_id found in Input sheet.")
+                return
+            postings = resolve_postings([(job_posting_id, 1)], job_configs)
+        if not postings:
+            logging.error("No postings with a matching job configuration to process.")
             return
-        logging.info("\nJob Configuration:")
-        logging.info("-" * 50)
-        logging.info(f"Job Description:\n{target_job_config.job_description[:200]}...")
-        logging.info(f"\nRecruiter Prompt:\n{target_job_config.recruiter_prompt[:200]}...")
-        logging.info("-" * 50)
-        lever_api = LeverAPI(os.getenv("LEVER_API_KEY"))
+        for posting in postings:
+            logging.info("\nJob Configuration:")
+            logging.info("-" * 50)
+            logging.info(f"Posting: {posting.posting_id} (weight {posting.weight})")
+            logging.info(f"Job Description:\n{posting.job_config.job_description[:200]}...")
+            logging.info(f"\nRecruiter Prompt:\n{posting.job_config.recruiter_prompt[:200]}...")
+            logging.info("-" * 50)
+        prescreen_rules = {}
+        for posting in postings:
+            try:
+                prescreen_rules[posting.posting_id] = PrescreenRules.from_job_config(posting.job_config)
+            except ValueError as e:
+                logging.error(f"Pre-screen disabled for {posting.posting_id}: {str(e)}")
+                prescreen_rules[posting.posting_id] = PrescreenRules()
+        lever_api = LeverAPI(
+            os.getenv("LEVER_API_KEY"),
+            fetch_workers=int(os.getenv("LEVER_FETCH_WORKERS", "8"))
+        )
+        evaluator = get_evaluator()
+        created = sheets_api.ensure_sheets(spreadsheet_id, {
+            "Results": RESULTS_HEADERS,
+            "Processed": PROCESSED_HEADERS
+        })
+        if created:
+            logging.info(f"Created sheets: {', '.join(created)}")
+        cache_dir = os.getenv("CACHE_DIR", ".cache")
+        journal = RunJournal(os.path.join(cache_dir, "journal.sqlite"))
+        sheet_writer = SheetWriteBuffer(sheets_api, spreadsheet_id)
+        tag_postings = {}  # candidate_id -> posting_id of the logged row awaiting a tag
+        tag_committer = TagCommitter(
+            lever_api,
+            on_tagged=lambda candidate_id: journal.record(tag_postings.get(candidate_id, ""), candidate_id, "tagged")
+        )
+
+        def commit_tag(posting_id, candidate_id):
+            tag_postings[candidate_id] = posting_id
+            tag_committer.submit(candidate_id)
+
+        def commit_tags(range_name, rows):
+            # Tag candidates in Lever only once their Processed row has been written
+            if range_name == sheet_writer.processed_range:
+                for row in rows:
+                    journal.record(row[0], row[1], "logged")
+                    commit_tag(row[0], row[1])
+
+        sheet_writer.flush_listeners.append(commit_tags)
+        processed_index = ProcessedIndex(sheets_api, spreadsheet_id)
+        processed_index.refresh()
+        logging.info(f"Loaded {len(processed_index)} processed candidates from the Processed sheet.")
         
         # Initialize batch processing variables
-        batch_size = 50
-        max_resumes = 600  # Maximum number of resumes to process
-        offset = 0
-        total_processed = 0
-        total_failed = 0
-        total_skipped = 0
-        
-        while total_processed + total_skipped < max_resumes:
-            # Download batch of resumes
-            downloaded_resumes = lever_api.download_resume(
-                posting_id=target_job_config.job_posting,
-                limit=batch_size,
-                offset=offset
-            )
-            
-            if not downloaded_resumes:
-                logging.info(f"No more resumes to process after offset {offset}")
-                break
-                
-            logging.info(f"Downloaded batch of {len(downloaded_resumes)} resumes from Lever (in memory).")
-            resume_processor = LocalResumeProcessor(
-                candidates_dir=None  # Not used for in-memory
-            )
-            
-            if not quota_manager.can_make_request():
-                logging.error("Free tier quota exceeded for today. Please try again tomorrow.")
-                break
-                
-            results = []
-            processed_count = 0
-            failed_count = 0
-            skipped_count = 0
-            
-            for resume_bytes, candidate_id, candidate_name in downloaded_resumes:
-                # Check if we've reached the maximum limit
-                if total_processed + total_skipped + processed_count + skipped_count >= max_resumes:
-                    logging.info(f"Reached maximum limit of {max_resumes} resumes")
-                    break
-                    
-                logging.info(f"\nProcessing resume {processed_count + 1}/{len(downloaded_resumes)}: {candidate_id} ({candidate_name})")
-                # Check if already processed
-                if is_already_processed(sheets_api, spreadsheet_id, job_posting_id, candidate_id):
-                    logging.info(f"Skipping {candidate_id} - already processed")
-                    skipped_count += 1
+        batch_size = 50  # Lever page size and Processed sheet refresh interval
+        max_resumes = 600  # Maximum number of resumes to process across all postings
+        eval_concurrency = int(os.getenv("EVAL_CONCURRENCY", "4"))
+        eval_batch_size = int(os.getenv("EVAL_BATCH_SIZE", "1"))  # Resumes scored per Gemini request
+        parse_workers = int(os.getenv("PARSE_WORKERS", str(os.cpu_count() or 1)))
+        token_budget = int(os.getenv("RESUME_TOKEN_BUDGET", "4000"))  # 0 disables truncation
+        rank_chunk_size = int(os.getenv("RANK_CHUNK_SIZE", "20"))  # 0 or 1 evaluates in Lever order
+        # Both caches hold candidate data, so they are bounded in size and age
+        cache_max_bytes = int(float(os.getenv("CACHE_MAX_MB", "256")) * 1024 * 1024)
+        cache_max_age = float(os.getenv("CACHE_MAX_AGE_DAYS", "30")) * 86400 or None  # 0 keeps entries indefinitely
+        evaluation_cache = SqliteCache(os.path.join(cache_dir, "evaluations.sqlite"),
+                                       max_bytes=cache_max_bytes, max_age=cache_max_age)
+        force_reevaluate = os.getenv("FORCE_REEVALUATE", "").lower() in ("1", "true", "yes")
+        parse_pool = ResumeParsePool(
+            workers=parse_workers,
+            cache=SqliteCache(os.path.join(cache_dir, "parsed_text.sqlite"),
+                              max_bytes=cache_max_bytes, max_age=cache_max_age)
+        )
+        results = []
+        counts = {"queued": 0, "processed": 0, "failed": 0, "skipped": 0, "prescreened": 0, "unparseable": 0, "tokens_saved": 0}
+        counts_lock = threading.Lock()
+
+        def count(key, amount=1):
+            with counts_lock:
+                counts[key] += amount
+
+        def limit_reached():
+            return counts["queued"] + counts["skipped"] >= max_resumes
+
+        def resumed_stage(posting, journal_states, queued_ids):
+            """Re-enter interrupted candidates from the journal at the step after their last completed one."""
+            for candidate_id, entry in journal_states.items():
+                state = entry["state"]
+                if entry["live"]:
+                    # An overlapping run is still working on this candidate
+                    logging.info(f"Skipping {candidate_id} - in progress in another run")
                     continue
-                    
-                if not quota_manager.can_make_request():
-                    logging.error(f"Free tier quota exceeded. Processed {processed_count} out of {len(downloaded_resumes)} resumes in this batch.")
-                    logging.info("Saving partial results and stopping.")
-                    save_results(results)
-                    return
-                    
-                try:
-                    resume_text = resume_processor.convert_pdf_to_text(resume_bytes)
+                item = {
+                    "posting": posting,
+                    "candidate_id": candidate_id,
+                    "candidate_name": entry["candidate_name"] or "unknown"
+                }
+                if state == "logged" or (state == "evaluated" and (posting.posting_id, candidate_id) in processed_index):
+                    # The Processed row is durable; only the Lever tag is missing
+                    if state == "evaluated":
+                        journal.record(posting.posting_id, candidate_id, "logged")
+                    commit_tag(posting.posting_id, candidate_id)
+                    queued_ids.add(candidate_id)
+                    continue
+                if state == "evaluated" and entry["payload"]:
+                    item["evaluation"] = entry["payload"]
+                elif state == "parsed" and (posting.posting_id, candidate_id) in processed_index:
+                    # Another run finished this candidate after this journal entry was written
+                    queued_ids.add(candidate_id)
+                    continue
+                elif state == "parsed" and entry["payload"] and parse_pool.cache is not None:
+                    resume_text = parse_pool.cache.get(entry["payload"]["sha256"])
                     if not resume_text:
-                        logging.error(f"Could not parse resume for {candidate_id}")
-                        failed_count += 1
                         continue
-                        
-                    quota_manager.increment_request()
-                    evaluation = evaluate_resume(
-                        job_description=target_job_config.job_description,
-                        recruiter_prompt=target_job_config.recruiter_prompt,
-                        candidate_resume=resume_text
-                    )
-                    results.append({
-                        "candidate_id": candidate_id,
-                        "decision": evaluation["decision"],
-                        "score": evaluation["score"],
-                        "scores": evaluation["scores"],
-                        "explanation": evaluation["explanation"]
-                    })
-                    sheets_api.log_result(
-                        spreadsheet_id,
-                        target_job_config.job_description,
-                        candidate_id,
-                        evaluation["decision"],
-                        evaluation["explanation"]
-                    )
-                    # Log the processed candidate
-                    log_processed_candidate(sheets_api, spreadsheet_id, job_posting_id, candidate_id)
-                    processed_count += 1
-                    logging.info(f"Decision for {candidate_id}: {evaluation['decision']}")
-                except Exception as e:
-                    if "Free tier quota exceeded" in str(e):
-                        logging.error(f"Free tier quota exceeded. Processed {processed_count} out of {len(downloaded_resumes)} resumes in this batch.")
-                        logging.info("Saving partial results and stopping.")
-                        save_results(results)
-                        return
-                    logging.error(f"Error processing resume for {candidate_id}: {str(e)}")
-                    failed_count += 1
+                    item["resume_text"] = resume_text
+                else:
+                    continue
+                if limit_reached():
+                    return
+                logging.info(f"Resuming {candidate_id} for {posting.posting_id} from journal state '{state}'")
+                queued_ids.add(candidate_id)
+                count("queued")
+                yield item
+
+        def download_stage(posting, queued_ids):
+            """Stream new candidates for one posting from Lever until it runs out or the limit is hit."""
+            seen = 0
+            for resume_bytes, candidate_id, candidate_name in lever_api.iter_resumes(
+                posting.job_config.job_posting,
+                page_size=batch_size
+            ):
+                if limit_reached():
+                    logging.info(f"Reached maximum limit of {max_resumes} resumes")
+                    return
+                # Pick up rows appended by other runs every batch_size candidates
+                if seen and seen % batch_size == 0:
+                    processed_index.refresh()
+                seen += 1
+                if candidate_id in queued_ids or is_already_processed(processed_index, posting.posting_id, candidate_id):
+                    logging.info(f"Skipping {candidate_id} - already processed")
+                    count("skipped")
                     continue
-                    
-            # Update totals
-            total_processed += processed_count
-            total_failed += failed_count
-            total_skipped += skipped_count
-            
-            # Save batch results
-            save_results(results)
-            
-            # Log batch summary
-            logging.info(f"\nBatch Summary (offset {offset}):")
-            logging.info(f"- Successfully processed: {processed_count}")
-            logging.info(f"- Failed to process: {failed_count}")
-            logging.info(f"- Skipped (already processed): {skipped_count}")
-            logging.info(f"- Total processed so far: {total_processed}")
-            logging.info(f"- Total skipped so far: {total_skipped}")
-            logging.info(f"- Remaining until max limit: {max_resumes - (total_processed + total_skipped)}")
-            
-            # Move to next batch
-            offset += batch_size
-            
-            # If we got fewer resumes than the batch size, we're done
-            if len(downloaded_resumes) < batch_size:
-                break
+                queued_ids.add(candidate_id)
+                count("queued")
+                journal.record(posting.posting_id, candidate_id, "downloaded", candidate_name=candidate_name)
+                yield {
+                    "posting": posting,
+                    "candidate_id": candidate_id,
+                    "candidate_name": candidate_name,
+                    "resume_bytes": resume_bytes
+                }
+            logging.info(f"No more resumes to process for {posting.posting_id} after {seen} downloads")
+
+        def posting_stream(posting):
+            # Candidates the journal already carried past download are resumed or skipped, never
+            # re-fetched; so are candidates an overlapping live run is still working on
+            journal_states = journal.latest_states(posting.posting_id)
+            queued_ids = {
+                candidate_id for candidate_id, entry in journal_states.items()
+                if entry["state"] in ("logged", "tagged") or entry["live"]
+            }
+            yield from resumed_stage(posting, journal_states, queued_ids)
+            yield from download_stage(posting, queued_ids)
+
+        def parse_stage(item):
+            if "resume_bytes" not in item:
+                return item
+            resume_bytes = item.pop("resume_bytes")
+            try:
+                resume_text = parse_pool.parse_or_reject(resume_bytes)
+            except UnparseableResume as e:
+                # Retrying would fail the same way; log an ERROR row so the candidate is tagged and not downloaded again
+                item["evaluation"] = {
+                    "decision": "ERROR",
+                    "score": 0,
+                    "scores": {},
+                    "explanation": f"DECISION: ERROR\n\nUNPARSEABLE RESUME: {str(e)}"
+                }
+                journal.record(item["posting"].posting_id, item["candidate_id"], "evaluated", item["evaluation"])
+                count("unparseable")
+                logging.error(f"Could not parse resume for {item['candidate_id']}: {str(e)}")
+                return item
+            if not resume_text:
+                logging.error(f"Could not parse resume for {item['candidate_id']}")
+                count("failed")
+                return None
+            item["resume_text"] = resume_text
+            journal.record(item["posting"].posting_id, item["candidate_id"], "parsed",
+                           {"sha256": hashlib.sha256(resume_bytes).hexdigest()})
+            return item
+
+        def prescreen_stage(item):
+            """Reject clear misses on the posting's must-have rules without spending a Gemini request."""
+            rules = prescreen_rules[item["posting"].posting_id]
+            if "resume_text" not in item or not rules.enabled:
+                return item
+            reason = prescreen(rules, item["resume_text"], item["posting"].job_config.job_description)
+            if reason is None:
+                return item
+            del item["resume_text"]
+            item["evaluation"] = {
+                "decision": "REJECT",
+                "score": 0,
+                "scores": {},
+                "explanation": f"DECISION: REJECT\n\nPRE-SCREEN: {reason}"
+            }
+            journal.record(item["posting"].posting_id, item["candidate_id"], "evaluated", item["evaluation"])
+            count("prescreened")
+            logging.info(f"Pre-screen rejected {item['candidate_id']}: {reason}")
+            return item
+
+        def compact_stage(item):
+            if "resume_text" not in item:
+                return item
+            item["resume_text"], stats = compact_resume_text(item["resume_text"], token_budget)
+            count("tokens_saved", stats["tokens_saved"])
+            logging.info(f"Compacted resume for {item['candidate_id']}: ~{stats['original_tokens']} -> "
+                         f"~{stats['compacted_tokens']} tokens (saved ~{stats['tokens_saved']}"
+                         f"{', truncated' if stats['truncated'] else ''})")
+            return item
+
+        def rank_stage(items):
+            """Reorder a chunk so the resumes closest to their job description are evaluated first."""
+            positions_by_posting = {}
+            for position, item in enumerate(items):
+                if "resume_text" in item:
+                    positions_by_posting.setdefault(item["posting"].posting_id, []).append(position)
+            ranked = list(items)
+            for positions in positions_by_posting.values():
+                group = [items[position] for position in positions]
+                scores = similarity_scores(
+                    group[0]["posting"].job_config.job_description,
+                    [item["resume_text"] for item in group]
+                )
+                if scores is None:
+                    return items
+                order = sorted(range(len(group)), key=lambda index: scores[index], reverse=True)
+                # Each posting keeps the queue slots it had, so the fair scheduler's shares still hold
+                for position, index in zip(positions, order):
+                    ranked[position] = group[index]
+                logging.info(f"Ranked {len(group)} resumes for {group[0]['posting'].posting_id} by similarity: "
+                             + ", ".join(f"{group[index]['candidate_id']} ({scores[index]:.2f})" for index in order))
+            return ranked
+
+        def evaluate_stage(item):
+            if "evaluation" in item:
+                return item
+            job_config = item["posting"].job_config
+            logging.info(f"\nEvaluating resume for {item['candidate_id']} ({item['candidate_name']})")
+            item["evaluation"] = evaluate_resume(
+                job_description=job_config.job_description,
+                recruiter_prompt=job_config.recruiter_prompt,
+                candidate_resume=item.pop("resume_text"),
+                evaluator=evaluator,
+                cache=evaluation_cache,
+                force_reevaluate=force_reevaluate
+            )
+            journal.record(item["posting"].posting_id, item["candidate_id"], "evaluated", item["evaluation"])
+            return item
+
+        def evaluate_batch_stage(items):
+            ready = [item for item in items if "evaluation" in item]
+            # A batch shares one prompt prefix, so group candidates by posting
+            by_posting = {}
+            for item in items:
+                if "evaluation" not in item:
+                    by_posting.setdefault(item["posting"].posting_id, []).append(item)
+            for group in by_posting.values():
+                job_config = group[0]["posting"].job_config
+                logging.info(f"\nEvaluating batch of {len(group)} resumes: {', '.join(item['candidate_id'] for item in group)}")
+                evaluations = evaluate_resumes_batch(
+                    job_description=job_config.job_description,
+                    recruiter_prompt=job_config.recruiter_prompt,
+                    candidate_resumes=[item.pop("resume_text") for item in group],
+                    evaluator=evaluator,
+                    cache=evaluation_cache,
+                    force_reevaluate=force_reevaluate
+                )
+                for item, evaluation in zip(group, evaluations):
+                    if evaluation is None:
+                        count("failed")
+                        continue
+                    item["evaluation"] = evaluation
+                    journal.record(item["posting"].posting_id, item["candidate_id"], "evaluated", evaluation)
+                    ready.append(item)
+            return ready
+
+        def log_stage(item):
+            posting = item["posting"]
+            candidate_id = item["candidate_id"]
+            evaluation = item["evaluation"]
+            results.append({
+                "candidate_id": candidate_id,
+                "decision": evaluation["decision"],
+                "score": evaluation["score"],
+                "scores": evaluation["scores"],
+                "explanation": evaluation["explanation"]
+            })
+            # Results and Processed rows are queued together and flushed in that order
+            sheet_writer.add_candidate(
+                posting.job_config.job_description,
+                candidate_id,
+                evaluation["decision"],
+                evaluation["explanation"],
+                posting.posting_id,
+                candidate_id
+            )
+            processed_index.add(posting.posting_id, candidate_id)
+            count("processed")
+            logging.info(f"Decision for {candidate_id}: {evaluation['decision']}")
+            return item
+
+        def handle_error(stage_name, item, error):
+            if "Free tier quota exceeded" in str(error):
+                logging.error("Free tier quota exceeded. Stopping after in-flight evaluations.")
+                pipeline.stop()
+                return
+            logging.error(f"Error processing resume for {item['candidate_id']} ({stage_name}): {str(error)}")
+            count("failed")
+
+        if eval_batch_size > 1:
+            evaluate = Stage("evaluate", evaluate_batch_stage, workers=eval_concurrency, batch_size=eval_batch_size)
+        else:
+            evaluate = Stage("evaluate", evaluate_stage, workers=eval_concurrency)
+        stages = [
+            Stage("parse", parse_stage, workers=parse_workers),
+            Stage("prescreen", prescreen_stage),
+            Stage("compact", compact_stage)
+        ]
+        if rank_chunk_size > 1 and SIMILARITY_AVAILABLE:
+            # Collecting a chunk bounds memory while letting the strongest candidates use the quota first
+            stages.append(Stage("rank", rank_stage, batch_size=rank_chunk_size, batch_timeout=10.0))
+        elif rank_chunk_size > 1:
+            logging.warning("scikit-learn is not installed; evaluating resumes in Lever order")
+        pipeline = Pipeline(
+            stages + [evaluate, Stage("log", log_stage)],
+            queue_size=max(2 * eval_concurrency * eval_batch_size, 4),
+            on_error=handle_error
+        )
+        # Share the Gemini quota between postings in proportion to their weights
+        scheduler = FairScheduler()
+        for posting in postings:
+            scheduler.add(posting.posting_id, posting_stream(posting), weight=posting.weight)
+        logging.info(f"Running pipeline for {len(postings)} posting(s) with {eval_concurrency} evaluation workers "
+                     f"and {parse_workers} parse workers")
+        pipeline.run(scheduler)
+        if pipeline.stopped:
+            logging.info("Saving partial results and stopping.")
+        save_results(results)
                 
         # Log final summary
         logging.info(f"\nFinal Evaluation Summary:")
-        logging.info(f"- Total processed: {total_processed}")
-        logging.info(f"- Total failed: {total_failed}")
-        logging.info(f"- Total skipped: {total_skipped}")
+        logging.info(f"- Total processed: {counts['processed']}")
+        logging.info(f"- Total failed: {counts['failed']}")
+        logging.info(f"- Total skipped: {counts['skipped']}")
+        logging.info(f"- Rejected by pre-screen (no Gemini request): {counts['prescreened']}")
+        logging.info(f"- Unparseable resumes (logged as ERROR): {counts['unparseable']}")
+        logging.info(f"- Estimated prompt tokens saved by compaction: {counts['tokens_saved']}")
         logging.info(f"- Maximum limit: {max_resumes}")
         
     except Exception as e:
@@ -533,6 +971,39 @@ def process_local_resumes():
         import traceback
         logging.error("\nFull error traceback:")
         logging.error(traceback.format_exc())
+    finally:
+        if sheet_writer is not None:
+            try:
+                sheet_writer.close()
+                logging.info(f"Sheet writes: {sheet_writer.rows_written} rows in {sheet_writer.write_calls} append calls")
+            except Exception as e:
+                logging.error(f"Error flushing sheet writes ({sheet_writer.pending_count()} rows not written): {str(e)}")
+        if parse_pool is not None:
+            parse_pool.close()
+            if parse_pool.cache is not None:
+                logging.info(f"Parsed text cache: {parse_pool.cache.hits} hits, {parse_pool.cache.misses} misses")
+                parse_pool.cache.close()
+        if evaluator is not None:
+            evaluator.close()
+        metrics = gemini_retry_policy.metrics
+        logging.info(f"Gemini retries: {metrics['retries']} over {metrics['calls']} calls "
+                     f"({metrics['by_kind']}), {metrics['sleep_seconds']:.0f}s waiting, {metrics['gave_up']} gave up")
+        if _quota_manager is not None:
+            requests_used, tokens_used = _quota_manager.usage()
+            logging.info(f"Gemini quota used in the last {_quota_manager.window / 3600:g} hours: "
+                         f"{requests_used}/{_quota_manager.max_requests} requests, {tokens_used} tokens")
+            close_quota_manager()
+        if evaluation_cache is not None:
+            logging.info(f"Evaluation cache: {evaluation_cache.hits} hits, {evaluation_cache.misses} misses")
+            evaluation_cache.close()
+        if tag_committer is not None:
+            tag_committer.close()
+            logging.info(f"Tagged {len(tag_committer.tagged)} candidates as processed in Lever ({len(tag_committer.failed)} failed)")
+        if lever_api is not None:
+            logging.info(f"Lever cache: {lever_api.cache_stats['hits']} hits, {lever_api.cache_stats['misses']} misses")
+            lever_api.close()
+        if journal is not None:
+            journal.close()
 
 def save_results(results):
     if not results:
@@ -0,0 +1,143 @@
+import queue
+import threading
+import time
+from typing import Callable, Iterable, List, Optional
+
+_DONE = object()
+
+
+class Stage:
+    """A pipeline step run by `workers` threads.
+
+    `func` takes an item and returns the item to pass downstream, or None to drop it.
+    With `batch_size` > 1, each worker collects up to `batch_size` items (waiting at
+    most `batch_timeout` seconds after the first) and `func` takes the list and returns
+    a list of items to pass on, in any order; None entries are dropped.
+    """
+
+    def __init__(self, name: str, func: Callable, workers: int = 1,
+                 batch_size: int = 1, batch_timeout: float = 5.0):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self.batch_timeout = batch_timeout
+
+
+class Pipeline:
+    """Runs items through stages joined by bounded queues.
+
+    Errors raised by a stage are passed to `on_error(stage_name, item, error)` and the
+    item is dropped. `stop()` makes the source stop producing and every stage drain its
+    queue without doing further work, so a run can end early (e.g. on a quota stop).
+    """
+
+    def __init__(self, stages: List[Stage], queue_size: int = 10,
+                 on_error: Optional[Callable] = None):
+        self.stages = stages
+        self.queue_size = queue_size
+        self.on_error = on_error
+        self.stop_event = threading.Event()
+
+    def stop(self):
+        self.stop_event.set()
+
+    @property
+    def stopped(self) -> bool:
+        return self.stop_event.is_set()
+
+    def run(self, source: Iterable):
+        """Feed `source` through all stages and block until every item is handled."""
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        remaining = [stage.workers for stage in self.stages]
+        remaining_lock = threading.Lock()
+        threads = []
+
+        def worker(index: int):
+            stage = self.stages[index]
+            inbox = queues[index]
+            outbox = queues[index + 1] if index + 1 < len(queues) else None
+            done = False
+            while not done:
+                item = inbox.get()
+                if item is _DONE:
+                    break
+                batch = [item]
+                if stage.batch_size > 1:
+                    deadline = time.monotonic() + stage.batch_timeout
+                    while len(batch) < stage.batch_size:
+                        try:
+                            item = inbox.get(timeout=max(0, deadline - time.monotonic()))
+                        except queue.Empty:
+                            break
+                        if item is _DONE:
+                            done = True
+                            break
+                        batch.append(item)
+                if self.stopped:
+                    continue
+                try:
+                    results = stage.func(batch) if stage.batch_size > 1 else [stage.func(batch[0])]
+                except Exception as e:
+                    if self.on_error:
+                        for failed in batch:
+                            self.on_error(stage.name, failed, e)
+                    continue
+                if outbox is not None:
+                    for result in results:
+                        if result is not None:
+                            outbox.put(result)
+            with remaining_lock:
+                remaining[index] -= 1
+                last = remaining[index] == 0
+            if last and outbox is not None:
+                for _ in range(self.stages[index + 1].workers):
+                    outbox.put(_DONE)
+
+        for index, stage in enumerate(self.stages):
+            for n in range(stage.workers):
+                thread = threading.Thread(target=worker, args=(index,),
+                                          name=f"{stage.name}-{n}", daemon=True)
+                thread.start()
+                threads.append(thread)
+
+        try:
+            for item in source:
+                if self.stopped:
+                    break
+                queues[0].put(item)
+        finally:
+            for _ in range(self.stages[0].workers):
+                queues[0].put(_DONE)
+            for thread in threads:
+                thread.join()
+
+
+class FairScheduler:
+    """Interleaves several item streams in proportion to their weights.
+
+    Uses smooth weighted round-robin: with weights 2 and 1, streams are drawn A, B, A,
+    A, B, A, ... rather than in bursts. Streams are consumed lazily, and an exhausted
+    stream drops out so the others share its turns.
+    """
+
+    def __init__(self):
+        self.streams = {}
+        self.weights = {}
+
+    def add(self, name: str, items: Iterable, weight: int = 1):
+        self.streams[name] = iter(items)
+        self.weights[name] = max(1, weight)
+
+    def __iter__(self):
+        current = {name: 0 for name in self.streams}
+        while current:
+            total = sum(self.weights[name] for name in current)
+            for name in current:
+                current[name] += self.weights[name]
+            name = max(current, key=current.get)
+            current[name] -= total
+            try:
+                yield next(self.streams[name])
+            except StopIteration:
+                del current[name]
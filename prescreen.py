@@ -0,0 +1,209 @@
+import logging
+import re
+from dataclasses import dataclass, field
+from datetime import date
+from typing import List, Optional, Pattern, Sequence, Tuple
+
+try:
+    from sklearn.feature_extraction.text import TfidfVectorizer
+except ImportError:  # scikit-learn is optional; similarity rules are skipped without it
+    TfidfVectorizer = None
+
+SIMILARITY_AVAILABLE = TfidfVectorizer is not None
+
+# Must-have entries: /regex/ or a plain keyword, separated by commas, semicolons or newlines
+MUST_HAVE_ENTRY_PATTERN = re.compile(r'/(?:[^/\\]|\\.)+/|[^,;\n]+')
+
+MONTHS = {name: index for index, name in enumerate(
+    ("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"), start=1)}
+_MONTH = r'(?:(?P<{0}_name>jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?\s*|(?P<{0}_num>0?[1-9]|1[0-2])\s*[/.-]\s*)?'
+# Years as 2019 or '19
+_YEAR = r'(?P<{0}_year>(?:19|20)\d{{2}}|[\'’]\d{{2}})'
+_ONGOING = r'present|current(?:ly)?|now|today|(?:till|to)\s+date|date|ongoing|onwards|continuing'
+DATE_RANGE_PATTERN = re.compile(
+    _MONTH.format("start") + _YEAR.format("start")
+    + r'(?:\s*(?:-|–|—|to|until|till)\s*(?:' + _MONTH.format("end") + _YEAR.format("end")
+    + r'|(?P<ongoing>' + _ONGOING + r'))|\s+(?P<onwards>onwards|ongoing))',
+    re.IGNORECASE
+)
+YEAR_PATTERN = re.compile(r'\b(?:19|20)\d{2}\b')
+# Statements about overall experience, e.g. "8+ years of experience in software development".
+# "3 years of experience with Kafka" describes one tool, so it is not read as a total.
+EXPLICIT_YEARS_PATTERN = re.compile(
+    r'(\d{1,2}(?:\.\d+)?)\s*\+?\s*(?:years?|yrs?)\.?\s+(?:of\s+)?'
+    r'(?:(?:total|overall|professional|industry|work|working|hands-on|relevant)\s+){0,2}experience\b'
+    r'(?!\s*(?:with|using|on)\b)',
+    re.IGNORECASE
+)
+# Lines about degrees; their dates are study, not work
+EDUCATION_LINE_PATTERN = re.compile(
+    r'\b(?:b\.?\s?tech|m\.?\s?tech|b\.?\s?sc|m\.?\s?sc|b\.\s?e|m\.\s?e|b\.\s?a|m\.\s?a|bachelor\w*|master\w*|'
+    r'mba|ph\.?\s?d|degree|university|college|school|institute|diploma|graduat\w*|gpa|cgpa)\b',
+    re.IGNORECASE
+)
+EDUCATION_HEADING_PATTERN = re.compile(r'^\W*(?:education|academics?|academic background|qualifications)\W*$', re.IGNORECASE)
+SECTION_HEADING_PATTERN = re.compile(
+    r'^\W*(?:experience|work experience|professional experience|employment|work history|projects|skills|'
+    r'certifications?|summary|profile|achievements|publications|awards|interests)\W*$',
+    re.IGNORECASE
+)
+
+_warned_missing_sklearn = False
+
+
+@dataclass
+class PrescreenRules:
+    """Cheap local checks run before a resume is sent to Gemini.
+
+    A rule that is not set is not checked, so the default instance passes everything.
+    """
+    must_have: List[Tuple[str, Pattern]] = field(default_factory=list)
+    min_years: Optional[float] = None
+    min_similarity: Optional[float] = None
+
+    @classmethod
+    def from_job_config(cls, job_config) -> "PrescreenRules":
+        """Build rules from a JobConfig. Raises ValueError for an invalid must-have regex."""
+        return cls(
+            must_have=parse_must_have(job_config.must_have),
+            min_years=job_config.min_years_experience,
+            min_similarity=job_config.min_similarity
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.must_have) or self.min_years is not None or self.min_similarity is not None
+
+
+def parse_must_have(spec: str) -> List[Tuple[str, Pattern]]:
+    """Compile must-have entries to (entry, pattern). Plain keywords match case-insensitively as whole words."""
+    patterns = []
+    for entry in MUST_HAVE_ENTRY_PATTERN.findall(spec or ""):
+        entry = entry.strip()
+        if not entry:
+            continue
+        if len(entry) > 2 and entry.startswith('/') and entry.endswith('/'):
+            source = entry[1:-1]
+        else:
+            source = r'(?<!\w)' + re.escape(entry) + r'(?!\w)'
+        try:
+            patterns.append((entry, re.compile(source, re.IGNORECASE)))
+        except re.error as e:
+            raise ValueError(f"invalid must-have pattern {entry!r}: {e}")
+    return patterns
+
+
+def _month(match, prefix: str, default: int) -> int:
+    name = match.group(f"{prefix}_name")
+    if name:
+        return MONTHS[name[:3].lower()]
+    number = match.group(f"{prefix}_num")
+    return int(number) if number else default
+
+
+def _year(match, prefix: str, today: date) -> int:
+    year = match.group(f"{prefix}_year")
+    if len(year) == 4:
+        return int(year)
+    year = int(year[1:])
+    return 2000 + year if 2000 + year <= today.year else 1900 + year
+
+
+def work_lines(text: str) -> List[str]:
+    """Lines outside the education section that do not describe a degree."""
+    lines = []
+    in_education = False
+    for line in text.splitlines():
+        if EDUCATION_HEADING_PATTERN.match(line):
+            in_education = True
+            continue
+        if SECTION_HEADING_PATTERN.match(line):
+            in_education = False
+            continue
+        if not in_education and not EDUCATION_LINE_PATTERN.search(line):
+            lines.append(line)
+    return lines
+
+
+def extract_years_of_experience(text: str, today: Optional[date] = None) -> Optional[float]:
+    """Return the most generous reading of a resume's years of experience.
+
+    This is the largest of: explicit experience statements, the merged length of dated
+    work ranges, and the time since the earliest year mentioned outside education and
+    outside those ranges. The last one covers roles whose dates could not be parsed, so a partial estimate never
+    looks lower than the resume could mean. Returns None when there is no statement or
+    dated range to go on, so the rule cannot reject on a guess.
+    """
+    today = today or date.today()
+    now = today.year * 12 + today.month - 1
+    explicit = [float(value) for value in EXPLICIT_YEARS_PATTERN.findall(text)]
+    work_text = '\n'.join(work_lines(text))
+
+    intervals = []
+    for match in DATE_RANGE_PATTERN.finditer(work_text):
+        start = _year(match, "start", today) * 12 + _month(match, "start", 1) - 1
+        if match.group("ongoing") or match.group("onwards"):
+            end = now
+        else:
+            end = _year(match, "end", today) * 12 + _month(match, "end", 12) - 1
+        if start <= end <= now:
+            intervals.append((start, end + 1))
+    if not explicit and not intervals:
+        return None
+
+    months = 0
+    current_start = current_end = None
+    for start, end in sorted(intervals):
+        if current_end is None or start > current_end:
+            if current_end is not None:
+                months += current_end - current_start
+            current_start, current_end = start, end
+        else:
+            current_end = max(current_end, end)
+    if current_end is not None:
+        months += current_end - current_start
+
+    # Years outside any parsed range may belong to roles whose dates could not be read
+    stray_text = DATE_RANGE_PATTERN.sub(' ', work_text)
+    mentioned_years = [int(year) for year in YEAR_PATTERN.findall(stray_text) if int(year) <= today.year]
+    since_earliest = (now - min(mentioned_years) * 12 + 1) / 12 if mentioned_years else 0
+    return max(explicit + [months / 12, since_earliest])
+
+
+def similarity_scores(job_description: str, documents: Sequence[str]) -> Optional[List[float]]:
+    """TF-IDF cosine similarity of each document to the job description.
+
+    All documents are vectorized together with the job description and scored with one
+    sparse matrix product. Returns None if scikit-learn is not installed.
+    """
+    global _warned_missing_sklearn
+    if TfidfVectorizer is None:
+        if not _warned_missing_sklearn:
+            logging.warning("scikit-learn is not installed; skipping TF-IDF similarity")
+            _warned_missing_sklearn = True
+        return None
+    if not documents:
+        return []
+    vectorizer = TfidfVectorizer(stop_words="english", sublinear_tf=True)
+    try:
+        matrix = vectorizer.fit_transform([job_description, *documents])
+    except ValueError:  # Empty vocabulary, e.g. only stop words
+        return [0.0] * len(documents)
+    # Rows are L2-normalised, so the dot product is the cosine similarity
+    return (matrix[1:] @ matrix[0].T).toarray().ravel().tolist()
+
+
+def prescreen(rules: PrescreenRules, resume_text: str, job_description: str) -> Optional[str]:
+    """Return why a resume clearly fails the rules, or None if it should go to the model."""
+    missing = [entry for entry, pattern in rules.must_have if not pattern.search(resume_text)]
+    if missing:
+        return f"missing must-have requirement(s): {', '.join(missing)}"
+    if rules.min_years is not None:
+        years = extract_years_of_experience(resume_text)
+        if years is not None and years < rules.min_years:
+            return f"at most about {years:.1f} years of experience, below the required {rules.min_years:g}"
+    if rules.min_similarity is not None:
+        scores = similarity_scores(job_description, [resume_text])
+        if scores is not None and scores[0] < rules.min_similarity:
+            return f"similarity to the job description {scores[0]:.2f}, below the threshold {rules.min_similarity:g}"
+    return None
@@ -0,0 +1,130 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional, Tuple
+
+
+class QuotaLedger:
+    """Durable ledger of Gemini requests and tokens over a rolling window.
+
+    State lives in a SQLite file, so the count survives restarts and is shared by
+    concurrent workers and overlapping cron runs. Every check-and-record runs inside
+    `BEGIN IMMEDIATE`, which takes SQLite's write lock, so two processes cannot both
+    claim the last request of the window.
+    """
+
+    def __init__(self, path: str, max_requests: int = 1000, window_hours: float = 24,
+                 max_tokens: Optional[int] = None):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.max_requests = max_requests
+        self.max_tokens = max_tokens
+        self.window = window_hours * 3600
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS usage (ts REAL NOT NULL, requests INTEGER NOT NULL, tokens INTEGER NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS usage_ts ON usage (ts)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS buckets (name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+        )
+
+    @contextmanager
+    def transaction(self):
+        """Hold the thread lock and SQLite's write lock for the duration of the block."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def _usage(self, conn, now: float) -> Tuple[int, int]:
+        conn.execute("DELETE FROM usage WHERE ts < ?", (now - self.window,))
+        requests, tokens = conn.execute(
+            "SELECT COALESCE(SUM(requests), 0), COALESCE(SUM(tokens), 0) FROM usage"
+        ).fetchone()
+        return requests, tokens
+
+    def _has_room(self, requests: int, tokens: int) -> bool:
+        if requests >= self.max_requests:
+            return False
+        return self.max_tokens is None or tokens < self.max_tokens
+
+    def usage(self) -> Tuple[int, int]:
+        """Return (requests, tokens) recorded in the current window."""
+        with self.transaction() as conn:
+            return self._usage(conn, time.time())
+
+    def can_make_request(self) -> bool:
+        return self._has_room(*self.usage())
+
+    def try_acquire(self) -> bool:
+        """Atomically check the quota and record one request against it."""
+        now = time.time()
+        with self.transaction() as conn:
+            if not self._has_room(*self._usage(conn, now)):
+                return False
+            conn.execute("INSERT INTO usage (ts, requests, tokens) VALUES (?, 1, 0)", (now,))
+            return True
+
+    def increment_request(self):
+        with self.transaction() as conn:
+            conn.execute("INSERT INTO usage (ts, requests, tokens) VALUES (?, 1, 0)", (time.time(),))
+
+    def record_tokens(self, tokens: int):
+        if tokens:
+            with self.transaction() as conn:
+                conn.execute("INSERT INTO usage (ts, requests, tokens) VALUES (?, 0, ?)", (time.time(), tokens))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class TokenBucket:
+    """Requests-per-minute limiter whose state is stored in a QuotaLedger database.
+
+    All processes using the same ledger file and bucket name draw from one bucket, so
+    calls are paced across workers and overlapping runs instead of being rejected.
+    `capacity` is the largest burst allowed after an idle period.
+    """
+
+    def __init__(self, ledger: QuotaLedger, name: str, rate_per_minute: float, capacity: float = 1):
+        if rate_per_minute <= 0:
+            raise ValueError("rate_per_minute must be positive")
+        self.ledger = ledger
+        self.name = name
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity
+
+    def acquire(self) -> float:
+        """Block until a token is available. Returns the number of seconds waited."""
+        waited = 0.0
+        while True:
+            now = time.time()
+            with self.ledger.transaction() as conn:
+                row = conn.execute("SELECT tokens, updated FROM buckets WHERE name = ?", (self.name,)).fetchone()
+                tokens, updated = row if row else (self.capacity, now)
+                tokens = min(self.capacity, tokens + max(0.0, now - updated) * self.rate)
+                if tokens >= 1:
+                    tokens -= 1
+                    wait = 0.0
+                else:
+                    wait = (1 - tokens) / self.rate
+                conn.execute(
+                    "INSERT OR REPLACE INTO buckets (name, tokens, updated) VALUES (?, ?, ?)",
+                    (self.name, tokens, now)
+                )
+            if wait == 0.0:
+                return waited
+            time.sleep(wait)
+            waited += wait
@@ -0,0 +1,28 @@
+import threading
+import time
+
+
+class RateLimiter:
+    """Thread-safe limiter that spaces calls to at most `rate` per `period` seconds.
+
+    Each call to `acquire` reserves the next free slot and sleeps until it is due,
+    so concurrent workers sharing one limiter are paced instead of bursting.
+    """
+
+    def __init__(self, rate: float, period: float = 60.0):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.interval = period / rate
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Block until a call is allowed. Returns the number of seconds waited."""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        wait = slot - now
+        if wait > 0:
+            time.sleep(wait)
+        return wait
@@ -0,0 +1,184 @@
+import re
+from collections import Counter
+from typing import List, Tuple
+
+# Rough chars-per-token ratio for English prose with Gemini's tokenizer
+CHARS_PER_TOKEN = 4
+
+PAGE_NOISE_PATTERN = re.compile(
+    r'^(?:page\s*\d+(?:\s*(?:of|/)\s*\d+)?|[-–—\s]*\d{1,3}[-–—\s]*|\d{1,3}\s*/\s*\d{1,3})$',
+    re.IGNORECASE
+)
+SEPARATOR_PATTERN = re.compile(r'^[\s\-_=*#|:.•·]*$')
+WHITESPACE_PATTERN = re.compile(r'[ \t ​]+')
+HEADING_PATTERN = re.compile(r'^(?:#{1,6}\s+\S.*|[A-Z][A-Z &/,\-]{2,40}:?|\*\*[^*]{2,60}\*\*:?)$')
+
+# Relative share of the token budget by section heading keyword
+SECTION_WEIGHTS = {
+    "experience": 3, "employment": 3, "work history": 3, "skills": 2, "projects": 2,
+    "summary": 1.5, "profile": 1.5, "certification": 1, "education": 1,
+    "achievements": 1.5, "interests": 0.25, "hobbies": 0.25, "references": 0.1,
+}
+TRUNCATION_MARKER = "[...]"
+
+# Running headers/footers: short lines within this many lines of a page's top or bottom
+PAGE_EDGE_LINES = 2
+MAX_RUNNING_LINE_LENGTH = 80
+# Blocks at least this long are dropped when repeated verbatim (duplicate uploads, copies)
+MIN_DUPLICATE_BLOCK_CHARS = 120
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _clean_lines(page: str) -> List[str]:
+    """Collapse whitespace and drop page numbers and separators, keeping single blank lines."""
+    lines = []
+    for raw in page.split('\n'):
+        line = WHITESPACE_PATTERN.sub(' ', raw).strip()
+        if not line:
+            if lines and lines[-1]:
+                lines.append('')
+            continue
+        if PAGE_NOISE_PATTERN.match(line) or SEPARATOR_PATTERN.match(line):
+            continue
+        lines.append(line)
+    return lines
+
+
+def _blocks(lines: List[str]) -> List[List[Tuple[int, str]]]:
+    """Split lines at blank lines into blocks of (line index, line)."""
+    blocks = [[]]
+    for index, line in enumerate(lines):
+        if line:
+            blocks[-1].append((index, line))
+        elif blocks[-1]:
+            blocks.append([])
+    return [block for block in blocks if block]
+
+
+def normalize_lines(text: str) -> List[str]:
+    """Clean each page and drop running headers/footers and repeated blocks.
+
+    A short line that appears at the top or bottom of more than one page is kept only
+    the first time. A blank-line separated block long enough to be content (e.g. an
+    experience entry, or a second copy of the whole resume) is kept only the first
+    time. Lines that merely repeat inside sections, such as job titles, headings or
+    bullets, are left alone.
+    """
+    pages = [_clean_lines(page) for page in text.replace('\r\n', '\n').replace('\r', '\n').split('\f')]
+    page_edges = []  # Per page: {line index: lowercased line} for short lines at the top or bottom
+    edge_counts = Counter()
+    for page in pages:
+        content = [index for index, line in enumerate(page) if line]
+        edges = {index: page[index].lower() for index in content[:PAGE_EDGE_LINES] + content[-PAGE_EDGE_LINES:]
+                 if len(page[index]) <= MAX_RUNNING_LINE_LENGTH}
+        page_edges.append(edges)
+        edge_counts.update(set(edges.values()))
+    running = {line for line, pages_seen in edge_counts.items() if pages_seen > 1}
+
+    lines = []
+    seen_running = set()
+    seen_blocks = set()
+    for page, edges in zip(pages, page_edges):
+        for block in _blocks(page):
+            block_key = '\n'.join(line for _, line in block).lower()
+            if len(block_key) >= MIN_DUPLICATE_BLOCK_CHARS:
+                if block_key in seen_blocks:
+                    continue
+                seen_blocks.add(block_key)
+            kept = []
+            for index, line in block:
+                key = edges.get(index)
+                if key in running:
+                    if key in seen_running:
+                        continue
+                    seen_running.add(key)
+                kept.append(line)
+            if not kept:
+                continue
+            if lines:
+                lines.append('')
+            lines.extend(kept)
+    return lines
+
+
+def split_sections(lines: List[str]) -> List[List[str]]:
+    """Group lines into sections, each starting at a heading (the first may have none)."""
+    sections = [[]]
+    for line in lines:
+        if HEADING_PATTERN.match(line) and sections[-1]:
+            sections.append([])
+        sections[-1].append(line)
+    return [section for section in sections if section]
+
+
+def section_weight(section: List[str]) -> float:
+    heading = section[0].lower()
+    for keyword, weight in SECTION_WEIGHTS.items():
+        if keyword in heading:
+            return weight
+    return 1.0
+
+
+def truncate_sections(sections: List[List[str]], token_budget: int) -> List[str]:
+    """Fit sections into the budget, giving each a share weighted by its heading.
+
+    Every section keeps its heading and its first lines; a section that needs less than
+    its share hands the surplus to the others.
+    """
+    sizes = [estimate_tokens('\n'.join(section)) for section in sections]
+    weights = [section_weight(section) for section in sections]
+    allowances = [0] * len(sections)
+    remaining_budget = token_budget
+    open_sections = set(range(len(sections)))
+    # Repeatedly split what is left; sections that fit are settled and free their surplus
+    while open_sections and remaining_budget > 0:
+        total_weight = sum(weights[i] for i in open_sections)
+        settled = [i for i in open_sections if sizes[i] <= remaining_budget * weights[i] / total_weight]
+        if not settled:
+            for i in open_sections:
+                allowances[i] = int(remaining_budget * weights[i] / total_weight)
+            break
+        for i in settled:
+            allowances[i] = sizes[i]
+            remaining_budget -= sizes[i]
+            open_sections.discard(i)
+
+    output = []
+    for section, size, allowance in zip(sections, sizes, allowances):
+        if size <= allowance:
+            output.extend(section)
+            continue
+        used = 0
+        for n, line in enumerate(section):
+            cost = estimate_tokens(line) + 1
+            if n > 0 and used + cost > allowance:
+                output.append(TRUNCATION_MARKER)
+                break
+            output.append(line)
+            used += cost
+    return output
+
+
+def compact_resume_text(text: str, token_budget: int = 4000) -> Tuple[str, dict]:
+    """Normalize MarkItDown output and cut it to `token_budget` estimated tokens.
+
+    Returns the compacted text and stats with the original and compacted token
+    estimates. A budget of 0 disables truncation.
+    """
+    original_tokens = estimate_tokens(text)
+    lines = normalize_lines(text)
+    truncated = False
+    if token_budget and estimate_tokens('\n'.join(lines)) > token_budget:
+        lines = truncate_sections(split_sections(lines), token_budget)
+        truncated = True
+    compacted = '\n'.join(lines)
+    compacted_tokens = estimate_tokens(compacted)
+    return compacted, {
+        "original_tokens": original_tokens,
+        "compacted_tokens": compacted_tokens,
+        "tokens_saved": original_tokens - compacted_tokens,
+        "truncated": truncated
+    }
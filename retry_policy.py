@@ -0,0 +1,110 @@
+import logging
+import random
+import re
+import threading
+import time
+from typing import Callable, Optional, Tuple
+
+RETRY_DELAY_PATTERNS = [
+    re.compile(r'retry_delay\s*\{\s*seconds:\s*(\d+)'),
+    re.compile(r'"retryDelay"\s*:\s*"(\d+(?:\.\d+)?)s"'),
+    re.compile(r'retry in (\d+(?:\.\d+)?)\s*s', re.IGNORECASE),
+]
+
+
+class QuotaExhaustedError(Exception):
+    """The daily quota is used up; retrying before the window resets is pointless."""
+
+
+def server_retry_delay(error: Exception) -> Optional[float]:
+    """Return the retry delay the server asked for, if the error carries one."""
+    for detail in getattr(error, "details", None) or []:
+        delay = getattr(detail, "retry_delay", None)
+        if delay is not None and hasattr(delay, "seconds"):
+            return delay.seconds + getattr(delay, "nanos", 0) / 1e9
+    message = str(error)
+    for pattern in RETRY_DELAY_PATTERNS:
+        match = pattern.search(message)
+        if match:
+            return float(match.group(1))
+    return None
+
+
+def classify_error(error: Exception) -> Tuple[str, bool]:
+    """Return (kind, retryable) for an error raised by a Gemini call."""
+    code = getattr(error, "code", None)
+    message = str(error)
+    if code == 429 or "429" in message:
+        if "quota_value: 1000" in message or "PerDay" in message:
+            return "quota_exhausted", False
+        return "rate_limited", True
+    if code in (500, 502, 503) or "503" in message:
+        return "unavailable", True
+    if code == 504 or "timeout" in message.lower() or "deadline" in message.lower():
+        return "timeout", True
+    if code in (400, 401, 403, 404):
+        return "client_error", False
+    return "unknown", True
+
+
+class RetryPolicy:
+    """Retries a call with decorrelated jitter, honoring server retry hints.
+
+    Each wait is drawn from [base_delay, 3 * previous wait], capped at `max_delay`, so
+    concurrent workers that fail together do not retry in lockstep. When the server
+    sends a retry delay, the wait is that delay plus a little jitter. A call gives up
+    once `max_attempts` is reached or the next wait would exceed `total_budget` seconds
+    since the first attempt. Counts of retries by error kind, time spent sleeping and
+    give-ups are kept in `metrics`.
+    """
+
+    def __init__(self, max_attempts: int = 5, base_delay: float = 2.0, max_delay: float = 300.0,
+                 total_budget: float = 600.0, classify: Callable[[Exception], Tuple[str, bool]] = classify_error):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.total_budget = total_budget
+        self.classify = classify
+        self.metrics = {"calls": 0, "retries": 0, "sleep_seconds": 0.0, "gave_up": 0, "by_kind": {}}
+        self._lock = threading.Lock()
+
+    def _record(self, kind: Optional[str] = None, slept: float = 0.0, gave_up: bool = False, call: bool = False):
+        with self._lock:
+            if call:
+                self.metrics["calls"] += 1
+            if kind:
+                self.metrics["retries"] += 1
+                self.metrics["by_kind"][kind] = self.metrics["by_kind"].get(kind, 0) + 1
+            self.metrics["sleep_seconds"] += slept
+            if gave_up:
+                self.metrics["gave_up"] += 1
+
+    def next_delay(self, previous: float, hint: Optional[float]) -> float:
+        if hint is not None:
+            return hint + random.uniform(0, self.base_delay)
+        return min(self.max_delay, random.uniform(self.base_delay, max(self.base_delay, previous * 3)))
+
+    def call(self, func: Callable):
+        """Run `func()` until it succeeds, raising the last error once retries run out."""
+        self._record(call=True)
+        start = time.monotonic()
+        delay = self.base_delay
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                return func()
+            except QuotaExhaustedError:
+                raise
+            except Exception as e:
+                kind, retryable = self.classify(e)
+                if kind == "quota_exhausted":
+                    logging.error("Free tier quota exceeded. Please upgrade your plan or try again tomorrow.")
+                    raise QuotaExhaustedError("Free tier quota exceeded") from e
+                delay = self.next_delay(delay, server_retry_delay(e))
+                elapsed = time.monotonic() - start
+                if not retryable or attempt == self.max_attempts or elapsed + delay > self.total_budget:
+                    logging.error(f"Giving up after {attempt} attempt(s) and {elapsed:.0f}s ({kind}): {str(e)}")
+                    self._record(gave_up=True)
+                    raise
+                logging.warning(f"{kind} (attempt {attempt}/{self.max_attempts}), retrying in {delay:.1f} seconds...")
+                time.sleep(delay)
+                self._record(kind=kind, slept=delay)
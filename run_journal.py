@@ -0,0 +1,115 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, Optional
+
+# Candidate states in the order a candidate moves through them
+STATES = ("downloaded", "parsed", "evaluated", "logged", "tagged")
+
+
+class RunJournal:
+    """Append-only local journal of each candidate's progress through a run.
+
+    Every state change is one row in a SQLite file (WAL mode), so a restarted run can
+    see how far each candidate got without querying the Processed sheet or Lever, and
+    continue from there instead of repeating expensive steps.
+
+    Each journal instance registers a run and renews its lease every
+    `heartbeat_interval` seconds from a background thread. Entries of a run whose lease
+    is older than `lease_seconds`, or that closed, are safe to resume; entries of a live
+    run (e.g. an overlapping cron run) are still being worked on.
+    """
+
+    def __init__(self, path: str, lease_seconds: float = 300.0, heartbeat_interval: float = 30.0):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS events ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, posting_id TEXT NOT NULL, candidate_id TEXT NOT NULL, "
+            "candidate_name TEXT, state TEXT NOT NULL, payload TEXT, ts REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS events_candidate ON events (posting_id, candidate_id)")
+        if "run_id" not in {row[1] for row in self._conn.execute("PRAGMA table_info(events)")}:
+            # Events from before runs were tracked have no run and count as finished
+            self._conn.execute("ALTER TABLE events ADD COLUMN run_id TEXT")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS runs ("
+            "run_id TEXT PRIMARY KEY, pid INTEGER, started REAL NOT NULL, heartbeat REAL NOT NULL, "
+            "finished INTEGER NOT NULL DEFAULT 0)"
+        )
+        self.run_id = uuid.uuid4().hex
+        self.lease_seconds = lease_seconds
+        now = time.time()
+        self._conn.execute(
+            "INSERT INTO runs (run_id, pid, started, heartbeat) VALUES (?, ?, ?, ?)",
+            (self.run_id, os.getpid(), now, now)
+        )
+        self._conn.commit()
+        self._closed = threading.Event()
+        self._heartbeat = threading.Thread(
+            target=self._renew_lease, args=(heartbeat_interval,), name="run-journal-heartbeat", daemon=True
+        )
+        self._heartbeat.start()
+
+    def _renew_lease(self, interval: float):
+        while not self._closed.wait(interval):
+            with self._lock:
+                if self._closed.is_set():
+                    return
+                self._conn.execute("UPDATE runs SET heartbeat = ? WHERE run_id = ?", (time.time(), self.run_id))
+                self._conn.commit()
+
+    def record(self, posting_id: str, candidate_id: str, state: str,
+               payload: Optional[dict] = None, candidate_name: Optional[str] = None):
+        if state not in STATES:
+            raise ValueError(f"Unknown journal state: {state}")
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO events (posting_id, candidate_id, candidate_name, state, payload, ts, run_id) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (posting_id, candidate_id, candidate_name, state,
+                 json.dumps(payload) if payload is not None else None, time.time(), self.run_id)
+            )
+            self._conn.commit()
+
+    def latest_states(self, posting_id: str) -> Dict[str, dict]:
+        """Return {candidate_id: {"state", "payload", "candidate_name", "live"}} with each candidate's furthest state.
+
+        The payload is the one recorded with that state; the name is the last one recorded.
+        `live` is True if the last event came from another run that still holds its lease.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT candidate_id, candidate_name, state, payload, run_id FROM events WHERE posting_id = ? ORDER BY id",
+                (posting_id,)
+            ).fetchall()
+            live_runs = {run_id for (run_id,) in self._conn.execute(
+                "SELECT run_id FROM runs WHERE finished = 0 AND heartbeat >= ? AND run_id != ?",
+                (time.time() - self.lease_seconds, self.run_id)
+            )}
+        latest = {}
+        for candidate_id, candidate_name, state, payload, run_id in rows:
+            entry = latest.setdefault(candidate_id, {"state": None, "payload": None, "candidate_name": None})
+            entry["live"] = run_id in live_runs
+            if candidate_name:
+                entry["candidate_name"] = candidate_name
+            if entry["state"] is None or STATES.index(state) >= STATES.index(entry["state"]):
+                entry["state"] = state
+                entry["payload"] = json.loads(payload) if payload else None
+        return latest
+
+    def close(self):
+        """Release this run's lease and close the journal."""
+        self._closed.set()
+        with self._lock:
+            self._conn.execute("UPDATE runs SET finished = 1 WHERE run_id = ?", (self.run_id,))
+            self._conn.commit()
+            self._conn.close()
@@ -1,27 +1,47 @@
-from typing import List
+from typing import Callable, Dict, List, Optional
 from dataclasses import dataclass
 from google.oauth2.credentials import Credentials
 from googleapiclient.discovery import build
 from datetime import datetime
 import os
 import pickle
+import threading
+import time
 from google.auth.transport.requests import Request
 from google_auth_oauthlib.flow import InstalledAppFlow
 from dotenv import load_dotenv
 load_dotenv()
+
+RESULTS_HEADERS = ['Job Description', 'Applicant Name', 'Decision', 'Explanation', 'Timestamp']
+PROCESSED_HEADERS = ['Posting_ID', 'Opportunity_ID', 'Processed_Timestamp']
+
 @dataclass
 class JobConfig:
     job_posting: str
     job_description: str
     recruiter_prompt: str
+    # Optional local pre-screen rules (columns D-F), see prescreen.py
+    must_have: str = ""
+    min_years_experience: Optional[float] = None
+    min_similarity: Optional[float] = None
+
+def _optional_float(row: List[str], index: int) -> Optional[float]:
+    """Read an optional numeric cell, treating blanks and non-numbers as unset."""
+    if len(row) <= index or not str(row[index]).strip():
+        return None
+    try:
+        return float(row[index])
+    except ValueError:
+        print(f"⚠️ Ignoring non-numeric value {row[index]!r} in column {chr(ord('A') + index)}")
+        return None
 
 class SheetsAPI:
     def __init__(self, credentials: Credentials):
         self.service = build('sheets', 'v4', credentials=credentials)
         self.sheet = self.service.spreadsheets()
 
-    def get_job_configs(self, spreadsheet_id: str, range_name: str = "myproject!A2:C") -> List[JobConfig]:
-        """Fetch job posting, job description, and recruiter prompt from the Google Sheet."""
+    def get_job_configs(self, spreadsheet_id: str, range_name: str = "myproject!A2:F") -> List[JobConfig]:
+        """Fetch job posting, job description, recruiter prompt and optional pre-screen rules from the Google Sheet."""
         result = self.sheet.values().get(
             spreadsheetId=spreadsheet_id,
             range=range_name
@@ -37,7 +57,10 @@ class SheetsAPI:
             job_configs.append(JobConfig(
                 job_posting=row[0],
                 job_description=row[1],
-                recruiter_prompt=row[2]
+                recruiter_prompt=row[2],
+                must_have=row[3].strip() if len(row) > 3 else "",
+                min_years_experience=_optional_float(row, 4),
+                min_similarity=_optional_float(row, 5)
             ))
         print(job_configs)
         return job_configs
@@ -107,6 +130,146 @@ class SheetsAPI:
             else:
                 raise e
 
+    def ensure_sheets(self, spreadsheet_id: str, sheets: Dict[str, List[str]]) -> List[str]:
+        """Create any missing sheets with their header rows. Returns the titles created."""
+        metadata = self.sheet.get(
+            spreadsheetId=spreadsheet_id,
+            fields='sheets.properties.title'
+        ).execute()
+        existing = {s['properties']['title'] for s in metadata.get('sheets', [])}
+        missing = [title for title in sheets if title not in existing]
+        if not missing:
+            return []
+        self.sheet.batchUpdate(
+            spreadsheetId=spreadsheet_id,
+            body={
+                'requests': [{'addSheet': {'properties': {'title': title}}} for title in missing]
+            }
+        ).execute()
+        self.sheet.values().batchUpdate(
+            spreadsheetId=spreadsheet_id,
+            body={
+                'valueInputOption': 'RAW',
+                'data': [{'range': f"{title}!A1", 'values': [sheets[title]]} for title in missing]
+            }
+        ).execute()
+        return missing
+
+
+class SheetWriteBuffer:
+    """Write-behind buffer for rows appended to the Results and Processed sheets.
+
+    Rows are collected per range and flushed with one append call per range once
+    `max_rows` rows are pending or `max_delay` seconds have passed since the last
+    flush. A background thread enforces `max_delay` even when no new rows arrive;
+    call `close` to stop it and write what is left. Each append call is retried up to
+    `num_retries` times on rate limits and server errors; rows that still fail stay
+    buffered for the next flush instead of raising into the caller. Call `ensure_sheets` once at
+    startup; the buffer assumes the sheets exist. Functions in `flush_listeners` are
+    called with (range_name, rows) after each successful append, i.e. once those rows
+    are durable.
+    """
+
+    def __init__(self, sheets_api: SheetsAPI, spreadsheet_id: str, max_rows: int = 50,
+                 max_delay: float = 30.0, results_range: str = "Results!A2:F",
+                 processed_range: str = "Processed!A:C", num_retries: int = 5):
+        self.sheets_api = sheets_api
+        self.spreadsheet_id = spreadsheet_id
+        self.max_rows = max_rows
+        self.max_delay = max_delay
+        self.results_range = results_range
+        self.processed_range = processed_range
+        self.num_retries = num_retries
+        self.pending: Dict[str, List[List[str]]] = {}
+        self.flush_listeners: List[Callable[[str, List[List[str]]], None]] = []
+        self.write_calls = 0
+        self.rows_written = 0
+        self._lock = threading.RLock()
+        self._last_flush = time.monotonic()
+        self._closed = threading.Event()
+        self._timer = threading.Thread(target=self._flush_periodically, name="sheet-write-buffer", daemon=True)
+        self._timer.start()
+
+    def add_result(self, job_description: str, applicant_name: str, decision: str, explanation: str):
+        self.append(self.results_range, self._result_row(job_description, applicant_name, decision, explanation))
+
+    def add_processed(self, posting_id: str, opportunity_id: str):
+        self.append(self.processed_range, self._processed_row(posting_id, opportunity_id))
+
+    def add_candidate(self, job_description: str, applicant_name: str, decision: str, explanation: str,
+                      posting_id: str, opportunity_id: str):
+        """Queue a candidate's Results and Processed rows together, so neither is queued without the other."""
+        self.append_rows([
+            (self.results_range, self._result_row(job_description, applicant_name, decision, explanation)),
+            (self.processed_range, self._processed_row(posting_id, opportunity_id))
+        ])
+
+    @staticmethod
+    def _result_row(job_description: str, applicant_name: str, decision: str, explanation: str) -> List[str]:
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        return [job_description, applicant_name, decision, explanation, timestamp]
+
+    @staticmethod
+    def _processed_row(posting_id: str, opportunity_id: str) -> List[str]:
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        return [posting_id, opportunity_id, timestamp]
+
+    def append(self, range_name: str, row: List[str]):
+        self.append_rows([(range_name, row)])
+
+    def append_rows(self, rows: List[tuple]):
+        """Queue (range_name, row) pairs and flush if the buffer is full or due."""
+        with self._lock:
+            for range_name, row in rows:
+                self.pending.setdefault(range_name, []).append(row)
+            if (self.pending_count() >= self.max_rows
+                    or time.monotonic() - self._last_flush >= self.max_delay):
+                self._try_flush()
+
+    def _try_flush(self):
+        try:
+            self.flush()
+        except Exception as e:
+            # Rows stay buffered and are retried on the next flush or at close
+            print(f"⚠️ Sheet flush failed ({self.pending_count()} rows pending): {str(e)}")
+
+    def _flush_periodically(self):
+        while not self._closed.wait(max(1.0, self.max_delay / 4)):
+            with self._lock:
+                if not self.pending or time.monotonic() - self._last_flush < self.max_delay:
+                    continue
+                self._try_flush()
+
+    def close(self):
+        """Stop the background flush and write all pending rows."""
+        self._closed.set()
+        self._timer.join()
+        self.flush()
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return sum(len(rows) for rows in self.pending.values())
+
+    def flush(self):
+        """Append all pending rows. Rows that fail to write stay buffered and the error is raised."""
+        with self._lock:
+            self._last_flush = time.monotonic()
+            while self.pending:
+                # Results first, so a candidate is never marked processed before its result is written
+                range_name = self.results_range if self.results_range in self.pending else next(iter(self.pending))
+                rows = self.pending[range_name]
+                self.sheets_api.sheet.values().append(
+                    spreadsheetId=self.spreadsheet_id,
+                    range=range_name,
+                    valueInputOption='RAW',
+                    body={'values': rows}
+                ).execute(num_retries=self.num_retries)
+                del self.pending[range_name]
+                self.write_calls += 1
+                self.rows_written += len(rows)
+                for listener in self.flush_listeners:
+                    listener(range_name, rows)
+
 def get_google_credentials1():
     """Initialize Google credentials from OAuth client file."""
     credentials = None
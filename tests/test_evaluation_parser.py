@@ -0,0 +1,122 @@
+import json
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from evaluation_parser import (
+    parse_evaluation_response, parse_structured_batch_response, parse_structured_response, split_batch_response
+)
+
+PLAIN = """DECISION: SHORTLIST
+
+SCORES:
+1. Technical Skills & Experience: 50/60
+   - Technical Skills: 13/15
+   - Experience Level: 12/15
+   - Tools & Technologies: 12/15
+   - Domain Knowledge: 13/15
+
+2. Impact & Achievements: 30/40
+   - Quantifiable Impact: 15/20
+   - Problem Solving: 15/20
+
+TOTAL SCORE: 80
+"""
+
+SUB_SCORES = {"skills": 13, "experience": 12, "tools": 12, "domain": 13, "quantifiable": 15, "problem_solving": 15}
+
+
+def structured(**overrides):
+    data = {"decision": "REJECT", "technical_skills": 5, "experience_level": 5, "tools_and_technologies": 5,
+            "domain_knowledge": 5, "quantifiable_impact": 10, "problem_solving": 10, "total_score": 40,
+            "detailed_analysis": "Thin experience.", "red_flags": []}
+    data.update(overrides)
+    return data
+
+
+class TextResponseTest(unittest.TestCase):
+    def assertPlainScores(self, evaluation):
+        self.assertEqual(evaluation["decision"], "SHORTLIST")
+        self.assertEqual(evaluation["score"], 80)
+        self.assertEqual({key: evaluation["scores"][key] for key in SUB_SCORES}, SUB_SCORES)
+
+    def test_plain(self):
+        self.assertPlainScores(parse_evaluation_response(PLAIN))
+
+    def test_markdown_bold_on_either_side_of_the_colon(self):
+        for bold in (lambda label: f"**{label}**:", lambda label: f"**{label}:**"):
+            with self.subTest(example=bold("Technical Skills")):
+                text = PLAIN
+                for label in ("DECISION", "Technical Skills & Experience", "Technical Skills", "Experience Level",
+                              "Tools & Technologies", "Domain Knowledge", "Impact & Achievements",
+                              "Quantifiable Impact", "Problem Solving", "TOTAL SCORE"):
+                    text = text.replace(f"{label}:", bold(label), 1)
+                self.assertPlainScores(parse_evaluation_response(text))
+
+    def test_decision_inside_a_sentence(self):
+        evaluation = parse_evaluation_response("Having reviewed the resume, DECISION: reject\n")
+        self.assertEqual(evaluation["decision"], "REJECT")
+
+    def test_scores_are_clamped_and_totals_recomputed(self):
+        text = PLAIN.replace("Technical Skills: 13/15", "Technical Skills: 19/15").replace("TOTAL SCORE: 80", "TOTAL SCORE: 99")
+        with self.assertLogs(level="WARNING"):
+            evaluation = parse_evaluation_response(text)
+        self.assertEqual(evaluation["scores"]["skills"], 15)
+        self.assertEqual(evaluation["scores"]["technical"], 52)
+        self.assertEqual(evaluation["score"], 82)
+
+    def test_stated_parent_score_without_sub_scores(self):
+        evaluation = parse_evaluation_response("DECISION: REJECT\nTechnical Skills & Experience: 30/60\n")
+        self.assertEqual(evaluation["scores"]["technical"], 30)
+        self.assertEqual(evaluation["score"], 30)
+
+    def test_cut_off_answer(self):
+        text = PLAIN[:PLAIN.index("2. Impact")]
+        self.assertEqual(parse_evaluation_response(text)["scores"]["quantifiable"], 0)
+        with self.assertRaises(ValueError):
+            parse_evaluation_response(text, require_sub_scores=True)
+
+    def test_no_decision(self):
+        self.assertIsNone(parse_evaluation_response("I cannot evaluate this resume.")["decision"])
+
+
+class BatchResponseTest(unittest.TestCase):
+    def test_split_by_markers(self):
+        sections = split_batch_response("=== CANDIDATE C1 ===\nDECISION: REJECT\n**=== CANDIDATE C2 ===**\nDECISION: SHORTLIST")
+        self.assertEqual(sections, {"C1": "DECISION: REJECT", "C2": "DECISION: SHORTLIST"})
+
+    def test_repeated_marker_is_dropped(self):
+        sections = split_batch_response("=== CANDIDATE C1 ===\na\n=== CANDIDATE C1 ===\nb")
+        self.assertEqual(sections, {"C1": ""})
+
+
+class StructuredResponseTest(unittest.TestCase):
+    def test_valid(self):
+        evaluation = parse_structured_response(json.dumps(structured()))
+        self.assertEqual(evaluation["decision"], "REJECT")
+        self.assertEqual(evaluation["score"], 40)
+        self.assertEqual(parse_evaluation_response(evaluation["explanation"])["score"], 40)
+
+    def test_invalid_json_evaluation_raises(self):
+        for data in (structured(decision="MAYBE"), structured(problem_solving=25), structured(technical_skills="7")):
+            with self.subTest(data=data), self.assertRaises(ValueError):
+                parse_structured_response(json.dumps(data))
+
+    def test_non_json_falls_back_to_text(self):
+        with self.assertLogs(level="WARNING"):
+            self.assertEqual(parse_structured_response(PLAIN)["score"], 80)
+
+    def test_batch_skips_invalid_and_repeated_entries(self):
+        text = json.dumps({"candidates": [
+            structured(candidate="C1"), structured(candidate="C2", decision=None),
+            structured(candidate="C3"), structured(candidate="C3"),
+        ]})
+        with self.assertLogs(level="WARNING"):
+            evaluations = parse_structured_batch_response(text)
+        self.assertEqual(list(evaluations), ["C1"])
+
+
+if __name__ == "__main__":
+    unittest.main()
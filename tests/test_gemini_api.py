@@ -0,0 +1,135 @@
+"""GeminiEvaluator context caching against a local fake of google.generativeai.
+
+Run from the project root with `python -m unittest discover tests`.
+"""
+import os
+import sys
+import types
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakeApiError(Exception):
+    def __init__(self, code, message="error"):
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+        self.usage_metadata = types.SimpleNamespace(total_token_count=len(text))
+
+
+class FakeCachedContent:
+    created = []
+    fail_create = False
+
+    def __init__(self, contents, ttl):
+        self.name = f"cachedContents/{len(FakeCachedContent.created)}"
+        self.contents = contents
+        self.ttl = ttl
+        self.expired = False
+        self.deleted = False
+        self.updates = []
+
+    @classmethod
+    def create(cls, model, display_name, contents, ttl):
+        if cls.fail_create:
+            raise FakeApiError(400, "content below minimum cacheable size")
+        cached_content = cls(contents, ttl)
+        cls.created.append(cached_content)
+        return cached_content
+
+    def update(self, ttl):
+        if self.expired:
+            raise FakeApiError(404, "cached content not found")
+        self.updates.append(ttl)
+
+    def delete(self):
+        self.deleted = True
+
+
+class FakeGenerativeModel:
+    def __init__(self, model_name=None, generation_config=None, cached_content=None):
+        self.cached_content = cached_content
+        self.prompts = []
+
+    @classmethod
+    def from_cached_content(cls, cached_content, generation_config=None):
+        return cls(cached_content=cached_content, generation_config=generation_config)
+
+    def generate_content(self, prompt, generation_config=None):
+        if self.cached_content is not None and self.cached_content.expired:
+            raise FakeApiError(403, "cached content expired")
+        self.prompts.append(prompt)
+        return FakeResponse("DECISION: SHORTLIST")
+
+
+fake_genai = types.ModuleType("google.generativeai")
+fake_genai.configure = lambda api_key: None
+fake_genai.GenerativeModel = FakeGenerativeModel
+fake_genai.caching = types.SimpleNamespace(CachedContent=FakeCachedContent)
+fake_google = sys.modules.get("google") or types.ModuleType("google")
+fake_google.generativeai = fake_genai
+with mock.patch.dict(sys.modules, {
+    "google": fake_google,
+    "google.generativeai": fake_genai,
+    "google.generativeai.caching": fake_genai.caching,
+}):
+    sys.modules.pop("gemini_api", None)
+    import gemini_api
+
+
+class ContextCacheTest(unittest.TestCase):
+    def setUp(self):
+        FakeCachedContent.created = []
+        FakeCachedContent.fail_create = False
+        self.evaluator = gemini_api.GeminiEvaluator("key", context_cache_ttl=3600)
+
+    def test_prefix_is_cached_once_and_only_suffix_is_sent(self):
+        self.evaluator.generate("resume 1", prefix="rubric")
+        self.evaluator.generate("resume 2", prefix="rubric")
+        self.assertEqual(len(FakeCachedContent.created), 1)
+        self.assertEqual(FakeCachedContent.created[0].contents, ["rubric"])
+        model = self.evaluator._cached_models[self.evaluator._prefix_key("rubric")]
+        self.assertEqual(model.prompts, ["resume 1", "resume 2"])
+
+    def test_falls_back_to_full_prompt_when_caching_fails(self):
+        FakeCachedContent.fail_create = True
+        self.evaluator.generate("resume", prefix="rubric")
+        self.assertEqual(self.evaluator.model.prompts, ["rubricresume"])
+
+    def test_ttl_is_extended_before_expiry(self):
+        self.evaluator.generate("resume 1", prefix="rubric")
+        with mock.patch.object(gemini_api.time, "monotonic", return_value=gemini_api.time.monotonic() + 3500):
+            self.evaluator.generate("resume 2", prefix="rubric")
+        self.assertEqual(len(FakeCachedContent.created), 1)
+        self.assertEqual(len(FakeCachedContent.created[0].updates), 1)
+
+    def test_expired_content_is_recreated(self):
+        self.evaluator.generate("resume 1", prefix="rubric")
+        FakeCachedContent.created[0].expired = True
+        self.assertEqual(self.evaluator.generate("resume 2", prefix="rubric"), "DECISION: SHORTLIST")
+        self.assertEqual(len(FakeCachedContent.created), 2)
+        model = self.evaluator._cached_models[self.evaluator._prefix_key("rubric")]
+        self.assertIs(model.cached_content, FakeCachedContent.created[1])
+        self.assertEqual(model.prompts, ["resume 2"])
+
+    def test_failed_extension_recreates_content(self):
+        self.evaluator.generate("resume 1", prefix="rubric")
+        FakeCachedContent.created[0].expired = True
+        with mock.patch.object(gemini_api.time, "monotonic", return_value=gemini_api.time.monotonic() + 3500):
+            self.evaluator.generate("resume 2", prefix="rubric")
+        self.assertEqual(len(FakeCachedContent.created), 2)
+
+    def test_close_deletes_cached_content(self):
+        self.evaluator.generate("resume", prefix="rubric")
+        self.evaluator.close()
+        self.assertTrue(FakeCachedContent.created[0].deleted)
+
+
+if __name__ == "__main__":
+    unittest.main()
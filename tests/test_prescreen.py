@@ -0,0 +1,69 @@
+import os
+import sys
+import unittest
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from prescreen import PrescreenRules, extract_years_of_experience, parse_must_have, prescreen
+
+TODAY = date(2026, 10, 1)
+
+
+class YearsOfExperienceTest(unittest.TestCase):
+    def years(self, text):
+        return extract_years_of_experience(text, today=TODAY)
+
+    def test_statement_with_field_counts_as_total(self):
+        text = "Senior engineer with 8+ years of experience in software development\nAcme Corp, 2023 - Present"
+        self.assertEqual(self.years(text), 8.0)
+
+    def test_tool_specific_statement_alone_is_not_an_estimate(self):
+        self.assertIsNone(self.years("3+ years of experience with Kafka"))
+
+    def test_open_ended_ranges(self):
+        for text in ("Software Engineer (Jan 2016 - Ongoing)", "Engineer, Acme, 2016 onwards",
+                     "Engineer, Acme, Jan 2016 - Till Date", "Engineer, Acme, Jan 2016 - Present"):
+            with self.subTest(text=text):
+                self.assertGreater(self.years(text), 10)
+
+    def test_two_digit_years(self):
+        self.assertGreater(self.years("3+ years of experience with Kafka\nAcme, Mar '14 – Present"), 12)
+
+    def test_education_ranges_are_not_work(self):
+        self.assertLess(self.years("Developer Jan 2024 - Present\nBachelor of Engineering, 2018 - 2022"), 3)
+        self.assertLess(self.years("Developer, Beta 2023 - Present\nEDUCATION\nBSc Computer Science\n2019 - 2023"), 4)
+        self.assertGreater(self.years("Software Engineer (Jan 2016 - Ongoing)\nM.Tech 2014-2016"), 10)
+
+    def test_unparsed_roles_are_not_undercounted(self):
+        # Only the last role has a parseable range; the earlier year still bounds the estimate
+        text = "Beta Inc, 2023 - Present\nAcme Corp since March of 2014"
+        self.assertGreater(self.years(text), 12)
+
+    def test_overlapping_ranges_are_merged(self):
+        self.assertAlmostEqual(self.years("Acme Jan 2020 - Dec 2021\nBeta Jun 2021 - Dec 2021"), 2.0)
+
+    def test_nothing_to_go_on(self):
+        self.assertIsNone(self.years("Python developer"))
+
+
+class PrescreenTest(unittest.TestCase):
+    def test_senior_candidate_is_not_rejected(self):
+        rules = PrescreenRules(min_years=5)
+        for text in ("Senior engineer with 8+ years of experience in software development\nAcme Corp, 2023 - Present",
+                     "Software Engineer (Jan 2016 - Ongoing)\nM.Tech 2014-2016"):
+            with self.subTest(text=text):
+                self.assertIsNone(prescreen(rules, text, "job"))
+
+    def test_junior_candidate_is_rejected(self):
+        reason = prescreen(PrescreenRules(min_years=5), "Developer Jan 2024 - Present\nBSc 2019 - 2023", "job")
+        self.assertIn("below the required 5", reason)
+
+    def test_must_have(self):
+        rules = PrescreenRules(must_have=parse_must_have("Python, C++; /kubernetes|k8s/"))
+        self.assertIsNone(prescreen(rules, "Python and C++ on k8s", "job"))
+        self.assertIn("/kubernetes|k8s/", prescreen(rules, "Python and C++", "job"))
+
+
+if __name__ == "__main__":
+    unittest.main()